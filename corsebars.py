@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Débit des segments dans des barres de profilé de longueur fixe (2 m, 3 m...): affectation des pièces
+aux barres qui minimise le nombre de barres, puis regroupe la chute dans la dernière barre.
+
+Les longueurs sont en mm. Une pièce occupe sa longueur hors tout (pointe de l'onglet comprise)
+plus un trait de coupe; la dernière pièce d'une barre peut finir au bout de la barre.
+"""
+
+import math
+import time
+from collections import namedtuple
+
+UNIT = 10  # calculs en entiers, au dixième de mm
+
+MAX_ITEMS = 400  # nombre maximal de pièces d'une recherche de sous-ensemble
+
+Piece = namedtuple(
+    "Piece",
+    [
+        "segment",  # numéro du segment
+        "length",  # longueur du segment sur le contour
+        "stock",  # longueur débitée, pointes des onglets comprises
+    ],
+)
+
+CuttingPlan = namedtuple(
+    "CuttingPlan",
+    [
+        "bar",  # longueur d'une barre
+        "kerf",  # trait de coupe
+        "bars",  # pièces de chaque barre, dans l'ordre des segments
+        "lower_bound",  # nombre minimal de barres
+        "waste",  # chute totale
+    ],
+)
+
+
+def pieces(infos, thickness, sens):
+    """
+    Pièces à débiter pour les segments de `infos` (voir `corsetex.tikz_image`), profilé de `thickness` mm.
+
+    Une extrémité coupée à l'angle c dépasse le contour de thickness/tan(c) du côté du bord intérieur
+    quand celui-ci est plus long (angle rentrant): la longueur débitée est la longueur hors tout.
+    Le côté dépend de l'orientation `sens` du contour.
+
+    Lève ValueError si une coupe est impossible (angle de coupe nul ou plat: sommet dégénéré).
+    """
+    degenerate = [info[0] for info in infos if not math.isfinite(info[5]) or info[5] % 180 == 0]
+    if degenerate:
+        raise ValueError(f"angle de coupe dégénéré (0° ou 180°) à la fin du (des) segment(s) {', '.join(map(str, degenerate))}")
+
+    overhang = [sens * thickness / math.tan(math.radians(info[5])) for info in infos]
+    return [
+        Piece(info[0], info[3], math.ceil(round((info[3] + max(0, overhang[i - 1]) + max(0, overhang[i])) * UNIT, 6)) / UNIT)
+        for i, info in enumerate(infos)
+    ]
+
+
+def lower_bound(sizes, capacity):
+    """
+    Nombre minimal de barres: longueur totale, et une barre pour chaque pièce de plus d'une demi-barre.
+    """
+    return max(math.ceil(sum(sizes) / capacity), sum(1 for s in sizes if 2 * s > capacity))
+
+
+def first_fit_decreasing(sizes, capacity):
+    """
+    Pièces (indices) de chaque barre: chaque pièce, de la plus longue à la plus courte, va dans la première
+    barre où elle tient.
+    """
+    bars = []
+    free = []
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for b, room in enumerate(free):
+            if sizes[i] <= room:
+                bars[b].append(i)
+                free[b] -= sizes[i]
+                break
+        else:
+            bars.append([i])
+            free.append(capacity - sizes[i])
+    return bars
+
+
+def best_fill(items, sizes, capacity):
+    """
+    Sous-ensemble des pièces `items` de longueur totale maximale sans dépasser `capacity`: somme de
+    sous-ensemble exacte, les longueurs atteignables sont les bits d'un entier.
+    Retourne (longueur, pièces).
+    """
+    mask = (1 << (capacity + 1)) - 1
+    reach = [1]
+    for i in items:
+        reach.append((reach[-1] | reach[-1] << sizes[i]) & mask)
+        if reach[-1] >> capacity:
+            break  # barre pleine
+
+    total = reach[-1].bit_length() - 1
+    chosen = []
+    t = total
+    for k in range(len(reach) - 2, -1, -1):
+        if not reach[k] >> t & 1:
+            chosen.append(items[k])
+            t -= sizes[items[k]]
+    return total, chosen
+
+
+def exact_fill(sizes, capacity, window=MAX_ITEMS):
+    """
+    Pièces (indices) de chaque barre: chaque barre reçoit la plus longue pièce restante et le sous-ensemble
+    des `window` pièces suivantes qui la remplit au mieux.
+    """
+    remaining = sorted(range(len(sizes)), key=lambda i: -sizes[i])
+    bars = []
+    while remaining:
+        first = remaining[0]
+        _, chosen = best_fill(remaining[1 : 1 + window], sizes, capacity - sizes[first])
+        bars.append([first, *chosen])
+        chosen = set(chosen)
+        remaining = [i for i in remaining[1:] if i not in chosen]
+    return bars
+
+
+def _refill(bar, free, sizes, capacity, window=MAX_ITEMS):
+    """
+    Remplit la barre au mieux avec ses pièces et les pièces libres (tous les échanges possibles entre
+    elles); les pièces non retenues deviennent libres. Retourne vrai si la barre est plus remplie.
+    """
+    fill = sum(sizes[i] for i in bar)
+    if fill == capacity:
+        return False
+    items = sorted(free, key=lambda i: -sizes[i])[:window] + bar
+    total, chosen = best_fill(items, sizes, capacity)
+    if total <= fill:
+        return False
+    pool = set(bar) | set(free)
+    bar[:] = chosen
+    free[:] = sorted(pool - set(chosen))
+    return True
+
+
+def _empty_last(bars, sizes, capacity, deadline):
+    """
+    Essaie de vider la barre la moins remplie: chaque autre barre est remplie au mieux avec ses pièces
+    et les pièces libres. La longueur des pièces libres diminue à chaque étape; en cas d'échec elles restent
+    dans la dernière barre, dont la chute a augmenté. Retourne vrai si la barre a été vidée.
+    """
+    bars.sort(key=lambda bar: -sum(sizes[i] for i in bar))
+    free = bars.pop()
+
+    while free and time.perf_counter() < deadline:
+        progress = False
+        for bar in bars:
+            if _refill(bar, free, sizes, capacity):
+                progress = True
+                if not free:
+                    break
+        if not progress:
+            break
+
+    if free:
+        bars.append(free)
+        return False
+    return True
+
+
+def optimize(sizes, capacity, time_limit=0.2):
+    """
+    Affectation des pièces de longueurs `sizes` (entiers) à des barres de longueur `capacity`:
+    premier ajustement décroissant ou, s'il ne donne pas le minimum, remplissage exact barre par barre;
+    puis recherche locale bornée par `time_limit` s tant qu'une barre peut être supprimée.
+    Retourne les indices des pièces de chaque barre.
+    """
+    deadline = time.perf_counter() + time_limit
+    bars = first_fit_decreasing(sizes, capacity)
+    lower = lower_bound(sizes, capacity)
+    if len(bars) > lower:
+        filled = exact_fill(sizes, capacity)
+        if len(filled) < len(bars):
+            bars = filled
+
+    while len(bars) > 1 and time.perf_counter() < deadline:
+        if not _empty_last(bars, sizes, capacity, deadline):
+            break
+    return bars
+
+
+def cutting_plan(infos, thickness, sens, bar, kerf=2, time_limit=0.2):
+    """
+    Plan de débit des segments dans des barres de `bar` mm, trait de coupe `kerf` mm.
+    Lève ValueError si une pièce est plus longue qu'une barre ou ne peut pas être coupée.
+    """
+    items = pieces(infos, thickness, sens)
+    too_long = [p.segment for p in items if p.stock > bar]
+    if too_long:
+        raise ValueError(f"segment(s) plus long(s) qu'une barre de {bar} mm: {', '.join(map(str, too_long))}")
+
+    # une pièce occupe sa longueur et un trait de coupe, sauf au bout de la barre
+    sizes = [math.ceil(round((p.stock + kerf) * UNIT, 6)) for p in items]
+    capacity = math.floor(round((bar + kerf) * UNIT, 6))
+
+    bars = optimize(sizes, capacity, time_limit)
+    bars = sorted((sorted(items[i] for i in b) for b in bars), key=lambda b: -sum(p.stock for p in b))
+    waste = len(bars) * bar - sum(p.stock for p in items) - kerf * (len(items) - len(bars))
+    return CuttingPlan(bar, kerf, bars, lower_bound(sizes, capacity), round(waste, 1))
+
+
+def used(bar_pieces, kerf):
+    """
+    Longueur utilisée dans une barre, traits de coupe entre les pièces compris.
+    """
+    return round(sum(p.stock for p in bar_pieces) + kerf * (len(bar_pieces) - 1), 1)
+
+
+def print_plan(plan):
+    print(f"barres de {plan.bar:g} mm, trait de coupe {plan.kerf:g} mm: {len(plan.bars)} barre(s) (minimum {plan.lower_bound}), chute {plan.waste} mm")
+    print(f"{'barre':>5} {'pièces':>6} {'utilisé':>9} {'chute':>8}  segments")
+    for b, bar_pieces in enumerate(plan.bars):
+        length = used(bar_pieces, plan.kerf)
+        print(f"{b + 1:>5} {len(bar_pieces):>6} {length:>9.1f} {plan.bar - length:>8.1f}  {' '.join(str(p.segment) for p in bar_pieces)}")
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+import corsepages
+import corsepoints
+import corseprofile
+import corsetex
+from corsecache import Cache
+
+
+@contextmanager
+def redirect(file):
+    """
+    Redirige la sortie standard et la sortie d'erreur (y compris celles de LaTeX) vers `file`.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    os.dup2(file.fileno(), 1)
+    os.dup2(file.fileno(), 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        os.close(saved[0])
+        os.close(saved[1])
+
+
+# travaux commencés (1) dans les processus du pool, partagé par le pool (voir init_worker)
+started = None
+
+
+def init_worker(slots, state):
+    global started
+    corsetex.latex_slots = slots
+    started = state
+
+
+def run(job, index=None):
+    """
+    Génère le document d'un fichier de points, dans un processus du pool.
+
+    La sortie est écrite dans un fichier .log à côté du document. Les erreurs ne sont pas
+    propagées: elles sont retournées dans le résultat, avec le rapport du profil s'il est demandé.
+    """
+    if started is not None and index is not None:
+        started[index] = 1
+    output = Path(job["output"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    result = dict(points=job["points"], output=str(output), status="ok", seconds=0, error="")
+
+    profile = corseprofile.start(job["cprofile"]) if job["profile"] or job["cprofile"] else None
+    start = time.perf_counter()
+    with output.with_suffix(".log").open("w") as log, redirect(log):
+        try:
+            with corseprofile.phase("load"):
+                points = corsepoints.load(job["points"])
+            corsetex.calcule(
+                job["taille"],
+                job["epaisseur"] / 10,
+                points,
+                not job["contour"],
+                output_file=output,
+                recto=job["recto"],
+                cache=None if job["no_cache"] else Cache(),
+                force=job["force"],
+                use_format=job["format"],
+                native=job["native"],
+                svg=job["svg"],
+                tolerance=job["tolerance"] / 10,
+                layout=job["pages"],
+                bar=job["barre"],
+                kerf=job["trait"],
+            )
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "erreur"
+            result["error"] = str(e) or type(e).__name__
+    result["seconds"] = round(time.perf_counter() - start, 2)
+
+    if profile is not None:
+        corseprofile.stop()
+        result["profile"] = profile.report()
+        if job["cprofile"]:
+            profile.dump(output.with_suffix(".prof"))
+            result["cprofile"] = str(output.with_suffix(".prof"))
+
+    return result
+
+
+def jobs_list(args):
+    """
+    Liste des fichiers à traiter: entrées du manifeste puis fichiers (ou motifs) de la ligne de commande.
+
+    Le manifeste est une liste JSON d'objets {"points": ..., "taille": ..., "epaisseur": ..., "tolerance": ..., "recto": ..., "contour": ..., "pages": ..., "barre": ..., "output": ...}
+    dont seul "points" est obligatoire. Les chemins sont relatifs au répertoire du manifeste.
+    """
+    defaults = dict(
+        taille=args.size,
+        epaisseur=args.thickness,
+        recto=args.recto,
+        contour=args.contour,
+        no_cache=args.no_cache,
+        force=args.force,
+        format=not args.no_format,
+        native=args.native,
+        svg=args.svg,
+        tolerance=args.tolerance,
+        pages=args.pages,
+        barre=args.barre,
+        trait=args.trait,
+        profile=args.profile is not None,
+        cprofile=args.cprofile is not None,
+    )
+
+    entries = []
+    if args.manifest:
+        base = args.manifest.parent
+        for entry in json.loads(args.manifest.read_text()):
+            entry = dict(entry)
+            entry["points"] = base / entry["points"]
+            if "output" in entry:
+                entry["output"] = base / entry["output"]
+            entries.append(entry)
+
+    for pattern in args.files:
+        files = sorted(glob.glob(pattern)) or [pattern]
+        entries.extend(dict(points=Path(f)) for f in files)
+
+    jobs = []
+    for entry in entries:
+        job = {**defaults, **entry}
+        points = Path(job["points"])
+        if "output" not in entry:
+            directory = args.directory or points.parent
+            job["output"] = directory / points.with_suffix(".pdf").name
+        job["points"] = str(points)
+        job["output"] = str(job["output"])
+        jobs.append(job)
+
+    # deux fichiers qui écriraient le même document (même nom avec -d): aucun des deux n'est généré
+    outputs = {}
+    for job in jobs:
+        outputs.setdefault(Path(job["output"]).resolve().with_suffix(""), []).append(job)
+    for same in outputs.values():
+        if len(same) > 1:
+            for job in same:
+                others = ", ".join(other["points"] for other in same if other is not job)
+                job["error"] = f"même document {Path(job['output']).with_suffix('')} que {others}"
+
+    return jobs
+
+
+def failed(job, error):
+    return dict(points=job["points"], output=job["output"], status="erreur", seconds=0, error=error)
+
+
+def execute(jobs, indices, workers, slots, state, results):
+    """
+    Génère les documents des travaux `indices` dans un pool de `workers` processus, les résultats
+    sont rangés dans `results`.
+
+    Si un processus s'arrête brutalement (plantage, mémoire), le pool est inutilisable et les travaux
+    non terminés sont retournés: (commencés, pas encore commencés).
+    """
+    for i in indices:
+        state[i] = 0
+
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(), initializer=init_worker, initargs=(slots, state)) as pool:
+        futures = {pool.submit(run, jobs[i], i): i for i in indices}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                unfinished.append(i)
+                continue
+            except Exception as e:
+                result = failed(jobs[i], str(e) or type(e).__name__)
+            print(f"{result['points']}: {result['status']} ({result['seconds']} s)")
+            results[i] = result
+
+    running = [i for i in unfinished if state[i]]
+    if not running:
+        # arrêt avant le début des travaux (initialisation du processus): chacun est relancé seul
+        return unfinished, []
+    return running, [i for i in unfinished if not state[i]]
+
+
+def print_summary(results, output_file=None):
+    """
+    Affiche le bilan (statut et durée de chaque fichier), ou l'écrit en CSV.
+    """
+    header = ["points", "output", "status", "seconds", "error"]
+    rows = [[r[h] for h in header] for r in results]
+
+    if output_file:
+        with output_file.open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    else:
+        width = max([len("points")] + [len(r["points"]) for r in results])
+        for r in results:
+            print(f"{r['points']:<{width}} {r['status']:>6} {r['seconds']:>8.2f}s  {r['error']}")
+
+
+def write_profile(results, output_file):
+    """
+    Écrit les rapports de profil de chaque fichier et leurs statistiques, affiche la durée des phases.
+    """
+    reports = [r["profile"] for r in results if "profile" in r]
+    summary = corseprofile.aggregate(reports)
+    runs = [dict(points=r["points"], output=r["output"], status=r["status"], **r["profile"]) for r in results if "profile" in r]
+    output_file.write_text(json.dumps(dict(summary=summary, runs=runs), indent=2) + "\n")
+
+    print(f"{'phase':<14} {'fichiers':>8} {'moyenne':>9} {'médiane':>9} {'p95':>9} {'max':>9}")
+    for name, p in summary["phases"].items():
+        print(f"{name:<14} {p['runs']:>8} {p['mean']:>8.3f}s {p['median']:>8.3f}s {p['p95']:>8.3f}s {p['max']:>8.3f}s")
+    print(f"profil écrit dans {output_file}")
+
+
+def main():
+
+    parse = argparse.ArgumentParser(
+        description="Génère les documents de plusieurs fichiers de points en parallèle",
+        formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=30),
+    )
+    parse.add_argument("files", metavar="fichier", nargs="*", help="fichier de points ou motif (*.json, *.pts)")
+    parse.add_argument("-m", "--manifest", type=Path, help="manifeste JSON des fichiers et de leurs paramètres")
+    parse.add_argument("-d", "--directory", type=Path, help="répertoire des documents générés")
+    parse.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="nombre de processus (défaut: nombre de cœurs)")
+    parse.add_argument("-l", "--latex", type=int, help="nombre maximal de compilations LaTeX simultanées (défaut: nombre de processus)")
+    parse.add_argument("-S", "--summary", type=Path, help="fichier CSV du bilan")
+    parse.add_argument("--taille", dest="size", metavar="TAILLE", type=float, default=27, help="taille du modèle en cm (défaut: 27)")
+    parse.add_argument("--epaisseur", dest="thickness", metavar="EPAISSEUR", type=float, default=10, help="épaisseur profilé en mm (défaut: 10)")
+    parse.add_argument("-t", "--tolerance", type=float, default=0, help="simplifie le contour avec une tolérance en mm")
+    parse.add_argument("-c", "--contour", action="store_true", help="affiche le contour uniqument")
+    parse.add_argument("-r", "--recto", action="store_true", help="affiche le recto (verso par défaut)")
+    parse.add_argument("-n", "--native", action="store_true", help="génère le PDF directement, sans LaTeX")
+    parse.add_argument("-s", "--svg", action="store_true", help="génère le modèle complet en SVG au lieu du PDF")
+    parse.add_argument("--no-cache", action="store_true", help="n'utilise pas le cache des calculs")
+    parse.add_argument("-f", "--force", action="store_true", help="recompile même si le PDF est à jour")
+    parse.add_argument("--no-format", action="store_true", help="n'utilise pas de format LaTeX précompilé")
+    parse.add_argument("--pages", choices=corsepages.LAYOUTS, default="grille", help="découpage en pages: fixe (historique), grille (défaut) ou mixte")
+    parse.add_argument("-b", "--barre", type=float, help="plan de débit dans des barres de BARRE mm")
+    parse.add_argument("--trait", type=float, default=2, help="trait de coupe en mm (défaut: 2)")
+    parse.add_argument("--profile", type=Path, help="rapport JSON des phases de chaque fichier et statistiques globales")
+    parse.add_argument("--cprofile", type=Path, help="profil cProfile fusionné de tous les fichiers")
+
+    args = parse.parse_args()
+
+    jobs = jobs_list(args)
+    if not jobs:
+        parse.error("aucun fichier de points")
+
+    # sémaphore et état des travaux partagés par les processus du pool
+    context = multiprocessing.get_context()
+    slots = context.Semaphore(args.latex or args.jobs)
+    state = context.Array("b", len(jobs))
+
+    results = [None] * len(jobs)
+    pending = []
+    for i, job in enumerate(jobs):
+        if "error" in job:
+            results[i] = failed(job, job["error"])
+            print(f"{job['points']}: erreur ({job['error']})")
+        else:
+            pending.append(i)
+
+    while pending:
+        running, pending = execute(jobs, pending, args.jobs, slots, state, results)
+
+        # les travaux en cours à l'arrêt d'un processus sont relancés seuls: seul le fichier
+        # qui a provoqué l'arrêt échoue, les autres reprennent dans un nouveau pool
+        for i in running:
+            crashed, _ = execute(jobs, [i], 1, slots, state, results)
+            if crashed:
+                results[i] = failed(jobs[i], "arrêt brutal du processus")
+                print(f"{jobs[i]['points']}: erreur (arrêt brutal du processus)")
+
+    print_summary(results, args.summary)
+
+    if args.profile:
+        write_profile(results, args.profile)
+    if args.cprofile:
+        corseprofile.merge_stats([r["cprofile"] for r in results if "cprofile" in r], args.cprofile)
+
+    if any(r["status"] != "ok" for r in results):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
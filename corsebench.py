@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Mesures de performance des étapes de calcul: orientation, image TikZ, document, rendu PNG,
+plan de débit des barres, index et recherche du point sous le curseur de l'éditeur.
+
+Chaque étape est mesurée sur les contours fournis (corse, breizh, romain) et sur des polygones
+synthétiques de 10 à 1 000 000 sommets, pour obtenir des courbes de passage à l'échelle.
+Les résultats sont écrits en JSON et peuvent être comparés à ceux d'une autre version.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+import corsebars
+import corsepoints
+import corsetex
+from corsegeo import as_array, orientation
+
+FORMAT = 1  # format du fichier de résultats
+CONTOURS = ["corse.json", "breizh.json", "romain.json"]
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+
+
+def synthetic(n):
+    """
+    Polygone simple de `n` sommets dans le repère des fichiers de points (image de 1200 pixels de largeur):
+    étoile lisse à cinq branches. Comme pour un vrai contour, le bord intérieur ne se croise pas
+    (un contour bruité multiplierait les croisements et ne mesurerait plus que leur recherche).
+    """
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = 1 + 0.15 * np.sin(5 * theta)
+    return np.column_stack((600 + 550 * r * np.cos(theta), 330 + 300 * r * np.sin(theta)))
+
+
+@contextlib.contextmanager
+def latex_stub():
+    """
+    Remplace la compilation LaTeX par une opération vide: seule la génération du source est mesurée.
+    """
+    compile_latex, latex_format = corsetex.compile_latex, corsetex.latex_format
+    corsetex.compile_latex = lambda tex_file, fmt=None: None
+    corsetex.latex_format = lambda preambule: None
+    try:
+        yield
+    finally:
+        corsetex.compile_latex, corsetex.latex_format = compile_latex, latex_format
+
+
+# Chaque étape prépare ses données (non mesuré) et retourne la fonction mesurée.
+
+
+def stage_orientation(points, options):
+    xy = as_array(points)
+    return lambda: orientation(xy)
+
+
+def stage_tikz(points, options):
+    model = corsetex.scale_points(points, 27)
+    return lambda: corsetex.tikz_image(model, 1.0)
+
+
+def stage_document(points, options):
+    output_file = options.directory / "bench.pdf"
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), (contextlib.nullcontext() if options.latex else latex_stub()):
+            corsetex.calcule(27, 1.0, points, True, output_file=output_file, force=True, use_format=False)
+
+    return run
+
+
+def stage_png(points, options):
+    import corsepng
+
+    # polices absentes: ImageFont lève OSError, l'étape est ignorée
+    corsepng.RenderSession(points)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            corsepng.calcule(915, 20, points=points)
+
+    return run
+
+
+def stage_bars(points, options):
+    # modèle de 2 m: plusieurs barres de 2 m
+    model = corsetex.scale_points(points, 200)
+    _, infos, _ = corsetex.tikz_image(model, 1.0, details=False)
+    sens = orientation(as_array(model))
+    return lambda: corsebars.cutting_plan(infos, 10, sens, 2000)
+
+
+def stage_grid(points, options):
+    from corseqt6 import PointGrid
+
+    xy = as_array(points).tolist()
+
+    def run():
+        grid = PointGrid()
+        for i, (x, y) in enumerate(xy):
+            grid.add(("v", i), x, y)
+            qx, qy = xy[i - 1]
+            grid.add(("m", i), (x + qx) / 2, (y + qy) / 2)
+
+    return run
+
+
+def stage_hittest(points, options):
+    from corseqt6 import PointGrid
+
+    xy = as_array(points)
+    grid = PointGrid()
+    for i, (x, y) in enumerate(xy.tolist()):
+        grid.add(("v", i), x, y)
+
+    # 1000 positions du curseur autour du contour
+    rng = np.random.default_rng(1)
+    queries = (xy[rng.integers(0, len(xy), 1000)] + rng.uniform(-10, 10, (1000, 2))).tolist()
+
+    def run():
+        for x, y in queries:
+            grid.nearest(x, y, 5)
+
+    return run
+
+
+# étape: (fonction, nombre maximal de sommets par défaut)
+STAGES = {
+    "orientation": (stage_orientation, None),
+    "tikz": (stage_tikz, 100000),
+    "document": (stage_document, 100000),
+    "png": (stage_png, 10000),
+    "bars": (stage_bars, 10000),
+    "grid": (stage_grid, None),
+    "hittest": (stage_hittest, None),
+}
+
+
+def measure(fn, min_time, repeat, sample=0.005):
+    """
+    Meilleure durée et durée médiane d'un appel de `fn`. Les appels courts sont groupés pour que chaque
+    mesure dure au moins `sample` s; les mesures sont répétées jusqu'à `repeat` fois tant que la durée
+    totale est inférieure à `min_time`.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    elapsed = timer.timeit(number)
+    while elapsed < sample:
+        number *= 10
+        elapsed = timer.timeit(number)
+
+    times = [elapsed / number]
+    while len(times) < repeat and sum(times) * number < min_time:
+        times.append(timer.timeit(number) / number)
+    return dict(runs=len(times), number=number, best=min(times), median=statistics.median(times))
+
+
+def inputs(sizes):
+    """
+    Contours à mesurer: (nom, points, synthétique).
+    """
+    directory = Path(__file__).parent
+    for name in CONTOURS:
+        if (directory / name).exists():
+            yield Path(name).stem, corsepoints.load(directory / name), False
+    for n in sizes:
+        yield f"synth-{n}", synthetic(n), True
+
+
+def exponent(rows):
+    """
+    Exposant k de la loi t ∝ n^k, ajustée (moindres carrés en log-log) sur les mesures synthétiques.
+    """
+    rows = [r for r in rows if r["synthetic"] and r["best"] > 0]
+    if len(rows) < 2:
+        return None
+    k = np.polyfit(np.log([r["vertices"] for r in rows]), np.log([r["best"] for r in rows]), 1)[0]
+    return round(float(k), 2)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+" if dirty else "")
+
+
+def run_benchmarks(stages, sizes, options):
+    results = []
+    skipped = {}
+    for stage in stages:
+        fn, limit = STAGES[stage]
+        for name, points, is_synthetic in inputs(sizes):
+            if stage in skipped:
+                break
+            n = len(points)
+            if limit is not None and n > limit and not options.all:
+                continue
+            try:
+                bench = fn(points, options)
+            except (ImportError, OSError) as e:
+                skipped[stage] = f"{type(e).__name__}: {e}"
+                print(f"{stage}: ignorée ({skipped[stage]})")
+                break
+            row = dict(stage=stage, input=name, vertices=n, synthetic=is_synthetic, **measure(bench, options.min_time, options.repeat))
+            print(f"{stage:<12} {name:<16} {n:>8} sommets {row['best'] * 1000:>11.3f} ms ({row['runs']} mesures)", flush=True)
+            results.append(row)
+    return results, skipped
+
+
+def print_scaling(results):
+    """
+    Courbes de passage à l'échelle: durée et durée par sommet pour chaque taille de polygone synthétique.
+    """
+    for stage in dict.fromkeys(r["stage"] for r in results):
+        rows = [r for r in results if r["stage"] == stage and r["synthetic"]]
+        if not rows:
+            continue
+        print(f"\n{stage} (exposant: {exponent(rows)})")
+        for r in rows:
+            bar = "#" * max(1, round(math.log10(r["best"] * 1e6 + 1) * 4))
+            print(f"  {r['vertices']:>8} {r['best'] * 1000:>11.3f} ms {r['best'] / r['vertices'] * 1e9:>10.1f} ns/sommet  {bar}")
+
+
+def compare(results, reference, threshold):
+    """
+    Compare aux résultats de référence (meilleure durée). Retourne la liste des régressions.
+    """
+    before = {(r["stage"], r["input"]): r for r in reference["results"]}
+    regressions = []
+    print(f"\ncomparaison avec {reference.get('commit') or 'la référence'} (seuil {threshold:g} %)")
+    for r in results:
+        old = before.get((r["stage"], r["input"]))
+        if old is None:
+            continue
+        ratio = r["best"] / old["best"] if old["best"] > 0 else 1
+        flag = ""
+        if ratio > 1 + threshold / 100:
+            flag = "RÉGRESSION"
+            regressions.append(dict(stage=r["stage"], input=r["input"], before=old["best"], after=r["best"], ratio=ratio))
+        print(f"  {r['stage']:<12} {r['input']:<16} {old['best'] * 1000:>11.3f} ms -> {r['best'] * 1000:>11.3f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main():
+
+    parse = argparse.ArgumentParser(
+        description="Mesure la durée des étapes de calcul sur les contours fournis et des polygones synthétiques",
+        formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=30),
+    )
+    parse.add_argument("-s", "--stages", default=",".join(STAGES), help=f"étapes mesurées (défaut: {','.join(STAGES)})")
+    parse.add_argument("-n", "--sizes", default=",".join(map(str, SIZES)), help="nombres de sommets des polygones synthétiques")
+    parse.add_argument("-o", "--output", type=Path, default="corsebench.json", help="fichier JSON des résultats (défaut: corsebench.json)")
+    parse.add_argument("-c", "--compare", type=Path, help="résultats de référence à comparer")
+    parse.add_argument("--seuil", type=float, default=10, help="seuil de régression en %% (défaut: 10)")
+    parse.add_argument("--min-time", type=float, default=0.5, help="durée minimale des mesures de chaque étape en s (défaut: 0.5)")
+    parse.add_argument("--repeat", type=int, default=20, help="nombre maximal de mesures (défaut: 20)")
+    parse.add_argument("--all", action="store_true", help="mesure toutes les tailles, sans la limite de chaque étape")
+    parse.add_argument("--latex", action="store_true", help="compile réellement le document avec LaTeX")
+
+    args = parse.parse_args()
+
+    stages = args.stages.split(",")
+    for stage in stages:
+        if stage not in STAGES:
+            parse.error(f"étape inconnue: {stage}")
+    sizes = [int(n) for n in args.sizes.split(",") if n]
+
+    reference = None
+    if args.compare:
+        reference = json.loads(args.compare.read_text())
+        if reference.get("format") != FORMAT:
+            parse.error(f"{args.compare}: format de résultats non supporté")
+
+    with tempfile.TemporaryDirectory() as directory:
+        args.directory = Path(directory)
+        results, skipped = run_benchmarks(stages, sizes, args)
+
+    print_scaling(results)
+
+    report = dict(
+        format=FORMAT,
+        commit=git_commit(),
+        date=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        python=platform.python_version(),
+        machine=platform.platform(),
+        latex=args.latex,
+        results=results,
+        scaling={stage: exponent([r for r in results if r["stage"] == stage]) for stage in stages if stage not in skipped},
+        skipped=skipped,
+    )
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nrésultats écrits dans {args.output}")
+
+    if reference is not None and compare(results, reference, args.seuil):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
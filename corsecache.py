@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Cache disque des calculs, adressé par le contenu (empreinte SHA-256 des paramètres).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+def default_directory():
+    """
+    Répertoire du cache: $CORSE_CACHE ou ~/.cache/corse
+    """
+    if os.environ.get("CORSE_CACHE"):
+        return Path(os.environ["CORSE_CACHE"])
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "corse"
+
+
+def source_version(*files):
+    """
+    Empreinte du code source: toute modification du code invalide le cache.
+    """
+    h = hashlib.sha256()
+    for file in files:
+        h.update(Path(file).read_bytes())
+    return h.hexdigest()[:16]
+
+
+class Cache:
+    """
+    Cache disque avec éviction LRU lorsque la taille totale dépasse `max_size` octets.
+
+    Les compteurs cumulés et la taille totale des entrées sont dans `stats.json`, modifié sous verrou
+    (plusieurs processus de corsebatch partagent le cache). Le cache est facultatif: une erreur
+    d'écriture (répertoire en lecture seule, disque plein) est ignorée.
+    """
+
+    LOCK_TIMEOUT = 2  # attente maximale du verrou des compteurs (s)
+    LOCK_STALE = 10  # âge d'un verrou abandonné (s)
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024):
+        self.directory = Path(directory or default_directory())
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, *parts):
+        h = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                h.update(str(part.shape).encode())
+                h.update(np.ascontiguousarray(part, dtype=np.float64).tobytes())
+            else:
+                h.update(repr(part).encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            value = json.loads(path.read_text())
+            os.utime(path)  # pour l'éviction LRU
+        except (OSError, ValueError):
+            self.misses += 1
+            self._count("misses")
+            return None
+        self.hits += 1
+        self._count("hits")
+        return value
+
+    def put(self, key, value):
+        path = self.path(key)
+        text = json.dumps(value)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._write(path, text)
+        except OSError:
+            return  # le calcul continue sans cache
+
+        # l'éviction parcourt tout le cache: seulement quand la taille dépasse la limite,
+        # ou si elle n'est pas encore comptée (cache d'une version précédente)
+        size = len(text.encode())
+        counters = self._update(size=size)
+        if counters is not None and (counters["size"] > self.max_size or counters["size"] == size):
+            self.evict()
+
+    def evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à revenir sous la taille maximale.
+        Met à jour la taille totale comptée dans stats.json.
+        """
+        entries = []
+        total = 0
+        for path in self.directory.glob("??/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        # jusqu'à 90 % de la taille maximale: pas de nouveau parcours à chaque écriture
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_size * 0.9:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        self.evictions += evicted
+        self._update(reset=dict(size=total), evictions=evicted)
+
+    def stats(self):
+        """
+        Compteurs cumulés (tous processus confondus) et compteurs de cette instance.
+        """
+        try:
+            total = json.loads((self.directory / "stats.json").read_text())
+        except (OSError, ValueError):
+            total = {}
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "total": total,
+        }
+
+    def _count(self, name, n=1):
+        self._update(**{name: n})
+
+    def _update(self, reset=None, **increments):
+        """
+        Ajoute les `increments` aux compteurs de stats.json (et remplace ceux de `reset`) sous verrou.
+        Retourne les compteurs, None si stats.json n'a pas pu être modifié.
+        """
+        stats = self.directory / "stats.json"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._lock():
+                try:
+                    counters = json.loads(stats.read_text())
+                except (OSError, ValueError):
+                    counters = {}
+                for name, n in increments.items():
+                    counters[name] = counters.get(name, 0) + n
+                counters.update(reset or {})
+                self._write(stats, json.dumps(counters))
+        except OSError:
+            return None
+        return counters
+
+    @contextmanager
+    def _lock(self):
+        """
+        Verrou des compteurs: fichier créé en exclusivité. Un verrou abandonné (processus interrompu)
+        est supprimé après LOCK_STALE s. Lève TimeoutError après LOCK_TIMEOUT s d'attente.
+        """
+        lock = self.directory / "stats.lock"
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime > self.LOCK_STALE:
+                        lock.unlink(missing_ok=True)
+                        continue
+                except OSError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{lock} est verrouillé")
+                time.sleep(0.001)
+        try:
+            yield
+        finally:
+            lock.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write(path, text):
+        # écriture atomique: fichier temporaire puis renommage
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Types des arguments de la ligne de commande communs à corsetex et corsepng.
+"""
+
+import numpy as np
+
+
+def parse_values(text):
+    """
+    Liste de valeurs: "20,27,30" ou intervalle "début:fin:pas" (fin incluse).
+    """
+    if ":" in text:
+        start, stop, step = map(float, text.split(":"))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(v) for v in text.split(",")])
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Calculs géométriques sur le contour complet, sous forme de tableau (N, 2).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+Geometry = namedtuple(
+    "Geometry",
+    [
+        "sens",  # orientation du polygone (+1 ou -1)
+        "lengths",  # longueur de chaque segment [i, i+1]
+        "angles",  # angle (radians) à l'extrémité de chaque segment, avec le segment suivant
+        "cut_angles",  # angle de coupe (degrés) à l'extrémité de chaque segment
+        "normals",  # décalage de l'épaisseur vers l'intérieur, pour chaque segment
+        "interior",  # sommets du bord intérieur (extrémité de chaque segment)
+        "length_contour",  # longueur du contour
+        "length_interior",  # longueur du bord intérieur
+        "mid_length",  # longueur moyenne du profilé
+    ],
+)
+
+
+def as_array(polygon):
+    """
+    Convertit une liste de points en tableau (N, 2) de flottants.
+    """
+    return np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+
+
+def orientation(polygon):
+    """
+    Détermination orientation du polygone.
+    [principe](https://fr.wikipedia.org/wiki/Orientation_de_courbe)
+    """
+    polygon = as_array(polygon)
+    n = len(polygon)
+
+    # sélection du point: le dernier d'abscisse maximale
+    i_max = n - 1 - int(np.argmax(polygon[::-1, 0]))
+
+    # déterminant de la matrice d'orientation
+    x1, y1 = polygon[(i_max - 1) % n]
+    x2, y2 = polygon[i_max]
+    x3, y3 = polygon[(i_max + 1) % n]
+    det = (x2 - x1) * (y3 - y1) - (x3 - x1) * (y2 - y1)
+
+    return 1 if det >= 0 else -1
+
+
+def geometry(polygon, thickness, sens=None, interior=True):
+    """
+    Calcule en une passe les longueurs, angles, angles de coupe et le bord intérieur
+    d'un profilé d'épaisseur `thickness` qui suit le contour.
+    """
+    p1 = as_array(polygon)
+    p2 = np.roll(p1, -1, axis=0)
+    p3 = np.roll(p1, -2, axis=0)
+
+    if sens is None:
+        sens = orientation(p1)
+
+    # angle au sommet p2, entre [p2,p1] et [p2,p3]
+    v1_2 = p1 - p2
+    v2_3 = p3 - p2
+    det = v1_2[:, 0] * v2_3[:, 1] - v1_2[:, 1] * v2_3[:, 0]
+    dot = np.einsum("ij,ij->i", v1_2, v2_3)
+    angles = np.arctan2(det, dot)
+
+    lengths = np.hypot(v1_2[:, 0], v1_2[:, 1])
+    length_contour = float(lengths.sum())
+
+    # calcul angle de coupe
+    angles_degrees = np.degrees(angles)
+    cut_angles = np.where(angles_degrees >= 0, angles_degrees / 2, 180 + angles_degrees / 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # vecteur épaisseur le long de chaque segment
+        u = (p2 - p1) * sens / lengths[:, np.newaxis] * thickness
+
+        # rotation de -π/2: décalage perpendiculaire au segment
+        normals = np.column_stack((-u[:, 1], u[:, 0]))
+
+        if interior:
+            # rotation de -a/2 du vecteur u/sin(a/2) autour de l'extrémité du segment
+            w = u / np.sin(angles / 2)[:, np.newaxis]
+            c, s = np.cos(-angles / 2), np.sin(-angles / 2)
+            offset = np.column_stack((c * w[:, 0] + s * w[:, 1], -s * w[:, 0] + c * w[:, 1]))
+            inner = p2 + offset
+        else:
+            inner = np.empty((0, 2))
+
+    # la longueur du profilé est la longueur moyenne:
+    # - chaque bord est un trapèze, la surface du trapèze est (l1+l2)*h/2
+    # - la longueur du profilé est la surface du contour divisée par l'épaisseur
+    # - la surface du contour est la somme des surfaces des trapèzes, soit (∑(l1+l2))*h/2
+    # - et donc la longueur du profilé est ∑(l1+l2)/2
+    if len(inner) > 0:
+        d = inner - np.roll(inner, -1, axis=0)
+        length_interior = float(np.hypot(d[:, 0], d[:, 1]).sum())
+        mid_length = (length_contour + length_interior) / 2
+    else:
+        length_interior = 0.0
+        mid_length = length_contour
+
+    return Geometry(
+        sens,
+        lengths,
+        angles,
+        cut_angles,
+        normals,
+        inner,
+        length_contour,
+        length_interior,
+        mid_length,
+    )
+
+
+Crossing = namedtuple("Crossing", ["segment", "other", "contour"])
+
+
+def _orient(a, b, c):
+    return (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+
+
+def _grid_entries(lo, hi, valid, cell, max_entries=None):
+    """
+    Répartit les boîtes englobantes [lo, hi] dans une grille régulière de pas `cell`:
+    une entrée (case, boîte) pour chaque case couverte par une boîte.
+
+    Le pas est doublé tant que le nombre d'entrées dépasse `max_entries`.
+    """
+    origin = lo[valid].min(axis=0) if valid.any() else np.zeros(2)
+    extent = float((hi[valid].max(axis=0) - origin).max()) if valid.any() else 0
+    cell = max(cell, 1e-9)
+    # boîtes invalides (segments dégénérés, NaN) ramenées à l'origine avant la conversion en entiers
+    lo = np.where(valid[:, np.newaxis], lo, origin)
+    hi = np.where(valid[:, np.newaxis], hi, origin)
+    while True:
+        i0 = np.floor((lo - origin) / cell).astype(np.int64)
+        i1 = np.floor((hi - origin) / cell).astype(np.int64)
+        span = i1 - i0 + 1
+        counts = np.where(valid, span[:, 0] * span[:, 1], 0)
+        total = int(counts.sum())
+        if max_entries is None or total <= max_entries or cell >= extent:
+            break
+        cell *= 2
+
+    ids = np.repeat(np.arange(len(lo)), counts)
+    local = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = i0[ids, 0] + local % span[ids, 0]
+    cy = i0[ids, 1] + local // span[ids, 0]
+
+    return cx * _GRID_STRIDE + cy, ids, origin, cell
+
+
+_GRID_STRIDE = 1 << 32
+
+
+class GridIndex:
+    """
+    Index spatial de boîtes englobantes (x0, y0, x1, y1) sur une grille régulière.
+    """
+
+    def __init__(self, boxes, cell=None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        lo, hi = self.boxes[:, :2], self.boxes[:, 2:]
+        valid = np.isfinite(self.boxes).all(axis=1)
+        if cell is None:
+            # pas de l'ordre de la taille moyenne des boîtes
+            cell = float((hi - lo)[valid].max(axis=1).mean()) if valid.any() else 1
+        keys, ids, self.origin, self.cell = _grid_entries(lo, hi, valid, cell, 8 * max(1, len(lo)))
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = ids[order]
+
+    def query(self, x0, y0, x1, y1):
+        """
+        Indices triés des boîtes qui touchent le rectangle [x0, x1] × [y0, y1].
+        """
+        if len(self.keys) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        (ix0, iy0), (ix1, iy1) = np.floor((np.array([[x0, y0], [x1, y1]]) - self.origin) / self.cell).astype(np.int64)
+        ix0, iy0 = max(ix0, 0), max(iy0, 0)
+        ix1 = min(ix1, int(self.keys[-1] // _GRID_STRIDE))
+        if ix1 < ix0 or iy1 < iy0:
+            return np.empty(0, dtype=np.int64)
+
+        # une plage contiguë de clés par colonne de cases
+        cols = np.arange(ix0, ix1 + 1) * _GRID_STRIDE
+        start = np.searchsorted(self.keys, cols + iy0, side="left")
+        end = np.searchsorted(self.keys, cols + iy1, side="right")
+        counts = end - start
+        found = self.ids[np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        found = np.unique(found)
+
+        b = self.boxes[found]
+        keep = (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+        return found[keep]
+
+
+def intersections(polygon, interior):
+    """
+    Recherche les croisements du bord intérieur avec lui-même et avec le contour.
+
+    Les segments sont répartis dans une grille régulière: seules les paires de segments
+    qui partagent une case sont testées.
+
+    Les segments sont numérotés comme dans le tableau des segments: le segment n va du
+    sommet n au sommet n+1 du contour, son bord intérieur va de interior[n-2] à interior[n-1].
+    """
+    outer = as_array(polygon)
+    inner = as_array(interior)
+    n = len(inner)
+    if n < 3:
+        return []
+
+    # segments intérieurs [0, n) puis segments du contour [n, 2n)
+    a = np.concatenate((np.roll(inner, 1, axis=0), outer))
+    b = np.concatenate((inner, np.roll(outer, -1, axis=0)))
+    m = len(a)
+
+    valid = np.isfinite(a).all(axis=1) & np.isfinite(b).all(axis=1)
+    lo = np.where(valid[:, np.newaxis], np.minimum(a, b), 0)
+    hi = np.where(valid[:, np.newaxis], np.maximum(a, b), 0)
+
+    # taille de case: de l'ordre de la taille moyenne des segments
+    size = (hi - lo).max(axis=1)
+    cell = float(size[valid].mean()) if valid.any() else 0
+    keys, ids = _grid_entries(lo, hi, valid, cell, 8 * m)[:2]
+    total = len(keys)
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    ids = ids[order]
+
+    # paires d'entrées dans une même case
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], total]
+    group_end = np.repeat(ends, ends - starts)
+    nb = group_end - np.arange(total) - 1
+    first = np.repeat(np.arange(total), nb)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(nb) - nb, nb)
+
+    s1 = np.minimum(ids[first], ids[second])
+    s2 = np.maximum(ids[first], ids[second])
+
+    # au moins un segment intérieur, deux segments distincts
+    keep = (s1 < n) & (s1 != s2)
+    pairs = np.unique(s1[keep] * m + s2[keep])
+    s1, s2 = pairs // m, pairs % m
+
+    # rejet rapide sur les boîtes englobantes
+    keep = (lo[s1] <= hi[s2]).all(axis=1) & (lo[s2] <= hi[s1]).all(axis=1)
+    s1, s2 = s1[keep], s2[keep]
+
+    # croisement strict: les extrémités de chaque segment sont de part et d'autre de l'autre
+    o1 = _orient(a[s1], b[s1], a[s2])
+    o2 = _orient(a[s1], b[s1], b[s2])
+    o3 = _orient(a[s2], b[s2], a[s1])
+    o4 = _orient(a[s2], b[s2], b[s1])
+    keep = (o1 * o2 < 0) & (o3 * o4 < 0)
+    s1, s2 = s1[keep], s2[keep]
+
+    return [Crossing(int(i) + 1, int(j % n) + 1, bool(j >= n)) for i, j in zip(s1, s2)]
+
+
+Simplification = namedtuple("Simplification", ["keep", "removed", "deviation"])
+
+
+def _distances(p, a, b):
+    """
+    Distance de chaque point p au segment [a, b] correspondant.
+    """
+    ab = b - a
+    ap = p - a
+    norm2 = np.einsum("ij,ij->i", ab, ab)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.einsum("ij,ij->i", ap, ab) / norm2, 0, 1)
+    t = np.where(norm2 > 0, t, 0)
+    d = ap - ab * t[:, np.newaxis]
+    return np.hypot(d[:, 0], d[:, 1])
+
+
+def simplify(polygon, tolerance, fixed=()):
+    """
+    Simplification du polygone fermé par l'algorithme de Ramer-Douglas-Peucker: les sommets
+    à moins de `tolerance` de la ligne simplifiée sont supprimés. Les sommets `fixed` sont conservés.
+
+    Les intervalles sont traités niveau par niveau: chaque niveau de la récursion est une seule
+    opération vectorielle sur tous les points restants, soit O(N log N) en pratique.
+
+    Retourne les indices des sommets conservés, le nombre de sommets supprimés et l'écart maximal.
+    """
+    points = as_array(polygon)
+    n = len(points)
+    if n <= 3 or tolerance <= 0:
+        return Simplification(np.arange(n), 0, 0.0)
+
+    # le polygone est coupé en deux chaînes: du sommet 0 au sommet le plus éloigné, et retour
+    d = points - points[0]
+    far = int(np.argmax(np.hypot(d[:, 0], d[:, 1])))
+    closed = np.concatenate((points, points[:1]))
+
+    anchors = np.unique(np.r_[0, far, np.asarray(fixed, dtype=np.int64) % n, n])
+    keep = np.zeros(n + 1, dtype=bool)
+    keep[anchors] = True
+    starts = anchors[:-1]
+    ends = anchors[1:]
+    deviation = 0.0
+
+    while len(starts) > 0:
+        counts = ends - starts - 1
+        starts, ends, counts = starts[counts > 0], ends[counts > 0], counts[counts > 0]
+        if len(starts) == 0:
+            break
+
+        # sommets intérieurs de chaque intervalle, et distance à la corde de leur intervalle
+        group = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.cumsum(counts) - counts
+        index = starts[group] + 1 + np.arange(counts.sum()) - offsets[group]
+        dist = _distances(closed[index], closed[starts[group]], closed[ends[group]])
+
+        # sommet le plus éloigné de chaque intervalle
+        dmax = np.maximum.reduceat(dist, offsets)
+        first = np.flatnonzero(dist == dmax[group])
+        _, at = np.unique(group[first], return_index=True)
+        split = index[first[at]]
+
+        done = dmax <= tolerance
+        if done.any():
+            deviation = max(deviation, float(dmax[done].max()))
+
+        split = split[~done]
+        keep[split] = True
+        starts, ends = np.concatenate((starts[~done], split)), np.concatenate((split, ends[~done]))
+
+    keep = np.flatnonzero(keep[:n])
+    return Simplification(keep, n - len(keep), deviation)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Découpage du modèle en pages: choix de l'orientation et du placement des pages qui minimise
+le nombre de pages imprimées.
+
+Une page est (x0, y0, x1, y1, landscape) en cm, comme dans `corsetex.calcule`.
+"""
+
+import math
+
+import numpy as np
+
+from corsegeo import as_array
+
+STEP = 0.5  # résolution de la recherche en cm: les dimensions des pages en sont des multiples
+
+LAYOUTS = ["fixe", "grille", "mixte"]
+
+
+def _exact(v):
+    # coordonnées entières en int, comme celles du découpage historique
+    return int(v) if float(v).is_integer() else v
+
+
+def regular_tiles(dim_x, dim_y, page):
+    """
+    Découpage historique: grille ancrée en (0, 0) sur le rectangle englobant, orientation choisie
+    d'après les dimensions, toutes les pages imprimées.
+    """
+    page_x, page_y = page
+    if dim_y % page_x >= page_y:
+        tile_x, tile_y = page_y, page_x
+        landscape = False
+    else:
+        tile_x, tile_y = page_x, page_y
+        landscape = True
+
+    nb_x = math.ceil(dim_x / tile_x)
+    nb_y = math.ceil(dim_y / tile_y)
+    return [(tile_x * x, tile_y * y, tile_x * (x + 1), tile_y * (y + 1), landscape) for y in range(nb_y) for x in range(nb_x)]
+
+
+def _segment_cells(a, b, step, limit):
+    """
+    Cases (col, row) de côté `step` traversées par les segments [a[i], b[i]]: cases des extrémités
+    et cases de part et d'autre de chaque ligne de la grille franchie.
+
+    Les segments de longueur nulle ou aux extrémités non finies (bord intérieur dégénéré) sont ignorés.
+    Lève ValueError si un segment franchit plus de `limit` lignes de la grille.
+    """
+    valid = np.isfinite(a).all(axis=1) & np.isfinite(b).all(axis=1) & (a != b).any(axis=1)
+    a, b = a[valid], b[valid]
+
+    ca = np.floor(a / step).astype(np.int64)
+    cb = np.floor(b / step).astype(np.int64)
+    cells = [ca, cb]
+
+    for axis in (0, 1):
+        lo = np.minimum(ca[:, axis], cb[:, axis])
+        counts = np.abs(cb[:, axis] - ca[:, axis])
+        if (counts > limit).any():
+            raise ValueError("segment hors de la grille")
+        if counts.sum() == 0:
+            continue
+        i = np.repeat(np.arange(len(a)), counts)
+        k = lo[i] + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        # point de franchissement de la ligne k
+        d = b[i] - a[i]
+        t = (k * step - a[i, axis]) / d[:, axis]
+        other = np.floor((a[i, 1 - axis] + t * d[:, 1 - axis]) / step).astype(np.int64)
+        for side in (k - 1, k):
+            cell = np.empty((len(i), 2), dtype=np.int64)
+            cell[:, axis] = side
+            cell[:, 1 - axis] = other
+            cells.append(cell)
+
+    return np.concatenate(cells)
+
+
+def occupancy(picture, dim_x, dim_y, step=STEP):
+    """
+    Cases de côté `step` (col, row) qui doivent être imprimées: celles que traversent les lignes fermées
+    (contour, bord intérieur) et celles des étiquettes, ramenées dans le rectangle englobant du modèle
+    (comme avec le découpage historique, ce qui dépasse est dans la marge du cadre).
+
+    Lève ValueError si un segment sort largement du rectangle englobant.
+    """
+    # un segment dans le rectangle englobant (avec une marge) ne franchit pas plus de lignes
+    limit = math.ceil(max(dim_x, dim_y) / step) + 2 * math.ceil(1 / step) + 2
+
+    cells = []
+    for path in picture["paths"]:
+        p = as_array(path["points"])
+        cells.append(_segment_cells(p, np.roll(p, -1, axis=0), step, limit))
+
+    anchors = as_array([item[4]["at"] for item in picture["items"] if "at" in item[4]])
+    anchors = anchors[np.isfinite(anchors).all(axis=1)]
+    if len(anchors):
+        xy = np.clip(anchors, 0, [dim_x, dim_y])
+        cells.append(np.floor(xy / step).astype(np.int64))
+
+    cells = np.concatenate(cells) if cells else np.empty((0, 2), dtype=np.int64)
+    # les points sur le bord du rectangle englobant restent dans la dernière case
+    cells = np.minimum(cells, [max(0, math.ceil(dim_x / step) - 1), max(0, math.ceil(dim_y / step) - 1)])
+    return np.unique(np.maximum(cells, 0), axis=0)
+
+
+def _grid_counts(cells, w, h, ox):
+    """
+    Nombre de pages non vides de la grille décalée de (ox, oy), pour tous les oy de 0 à h - 1.
+    """
+    tx = (cells[:, 0] - ox) // w
+    ty = (cells[:, 1] - np.arange(h)[:, None]) // h
+    keys = np.sort(tx * (1 << 32) + ty, axis=1)
+    return 1 + (np.diff(keys, axis=1) != 0).sum(axis=1)
+
+
+def grid_tiles(cells, page, step=STEP, prefer=None):
+    """
+    Grille régulière d'une seule orientation: recherche du décalage et de l'orientation qui donnent
+    le moins de pages non vides. À égalité, la grille `prefer` (landscape, ox, oy) est conservée.
+    """
+    page_x, page_y = page
+    best = None
+    if prefer is not None:
+        landscape, ox, oy = prefer
+        w, h = (page_x, page_y) if landscape else (page_y, page_x)
+        best = (_grid_counts(cells, round(w / step), round(h / step), ox)[oy], *prefer)
+
+    for landscape in (True, False):
+        w, h = (page_x, page_y) if landscape else (page_y, page_x)
+        w, h = round(w / step), round(h / step)
+        for ox in range(w):
+            counts = _grid_counts(cells, w, h, ox)
+            oy = int(np.argmin(counts))
+            if best is None or counts[oy] < best[0]:
+                best = (counts[oy], landscape, ox, oy)
+
+    _, landscape, ox, oy = best
+    tile_x, tile_y = (page_x, page_y) if landscape else (page_y, page_x)
+    w, h = round(tile_x / step), round(tile_y / step)
+    keys = np.unique(np.column_stack(((cells[:, 1] - oy) // h, (cells[:, 0] - ox) // w)), axis=0)
+    return [
+        (_exact((ox + tx * w) * step), _exact((oy + ty * h) * step), _exact((ox + (tx + 1) * w) * step), _exact((oy + (ty + 1) * h) * step), landscape)
+        for ty, tx in keys.tolist()
+    ]
+
+
+def _cover(columns, w):
+    """
+    Intervalles [c, c + w) en nombre minimal qui couvrent les colonnes triées: glouton depuis la gauche.
+    """
+    starts = []
+    end = None
+    for c in columns:
+        if end is None or c >= end:
+            starts.append(c)
+            end = c + w
+    return starts
+
+
+def mixed_tiles(cells, page, step=STEP):
+    """
+    Bandes horizontales de pages, chacune avec sa propre orientation et ses pages placées librement.
+
+    Une bande commence à la première ligne de cases non couverte (c'est optimal: la décaler vers le haut
+    ne couvrirait rien de plus); programmation dynamique sur cette ligne, couverture gloutonne de la bande.
+    """
+    if len(cells) == 0:
+        return []
+
+    page_x, page_y = page
+    orientations = [(True, round(page_x / step), round(page_y / step)), (False, round(page_y / step), round(page_x / step))]
+
+    row0 = int(cells[:, 1].min())
+    rows = [[] for _ in range(int(cells[:, 1].max()) - row0 + 1)]
+    for col, row in cells.tolist():
+        rows[row - row0].append(col)
+    n = len(rows)
+
+    # best[r]: (pages, bande) pour couvrir les lignes r et suivantes
+    best = [None] * (n + 1)
+    best[n] = (0, None)
+    for r in range(n - 1, -1, -1):
+        if not rows[r]:
+            best[r] = (best[r + 1][0], None)
+            continue
+        for landscape, w, h in orientations:
+            columns = sorted(set(c for row in rows[r : r + h] for c in row))
+            starts = _cover(columns, w)
+            pages = len(starts) + best[min(n, r + h)][0]
+            if best[r] is None or pages < best[r][0]:
+                best[r] = (pages, (landscape, w, h, starts))
+
+    tiles = []
+    r = 0
+    while r < n:
+        band = best[r][1]
+        if band is None:
+            r += 1
+            continue
+        landscape, w, h, starts = band
+        y = (row0 + r) * step
+        tiles.extend((_exact(c * step), _exact(y), _exact((c + w) * step), _exact(y + h * step), landscape) for c in starts)
+        r += h
+    return tiles
+
+
+def layout(picture, dim_x, dim_y, page, mode="grille", step=STEP):
+    """
+    Pages du modèle selon `mode`:
+    - "fixe": découpage historique (grille ancrée en (0, 0), toutes les pages)
+    - "grille": grille régulière, décalage et orientation qui minimisent le nombre de pages non vides
+    - "mixte": bandes d'orientations différentes, pages placées librement dans chaque bande
+
+    Si l'occupation ne peut pas être calculée (contour dégénéré), le découpage historique est utilisé.
+    """
+    if mode == "fixe":
+        return regular_tiles(dim_x, dim_y, page)
+
+    try:
+        cells = occupancy(picture, dim_x, dim_y, step)
+    except ValueError:
+        return regular_tiles(dim_x, dim_y, page)
+    if mode == "mixte":
+        return mixed_tiles(cells, page, step)
+    if mode == "grille":
+        landscape = regular_tiles(dim_x, dim_y, page)[0][4] if dim_x > 0 and dim_y > 0 else True
+        return grid_tiles(cells, page, step, prefer=(landscape, 0, 0))
+    raise ValueError(mode)
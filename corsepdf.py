@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Écriture directe en PDF des pages du modèle et des tableaux, sans LaTeX.
+"""
+
+import zlib
+
+import corsebars
+from corsestyle import COLORS, DASHES, number
+
+CM = 72 / 2.54  # points PDF par cm
+MM = CM / 10
+
+A4 = (210 * MM, 297 * MM)
+MARGIN = 10 * MM  # marges gauche et haute, comme dans le document LaTeX
+
+# polices standard PDF (non incorporées)
+FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold", "F3": "Helvetica-Oblique"}
+
+# largeur des caractères de Helvetica, en 1/1000 em
+HELVETICA = dict(
+    zip(
+        " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~°é×",
+        [
+            278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+            556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+            1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+            667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+            333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+            556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+            400, 556, 584,
+        ],
+    )
+)  # fmt: skip
+
+def text_width(text, size):
+    return sum(HELVETICA.get(c, 556) for c in text) * size / 1000
+
+
+def points(thickness):
+    """
+    Épaisseur TikZ ("0.5pt") en points.
+    """
+    return float(str(thickness).removesuffix("pt"))
+
+
+def _escape(text):
+    return text.encode("cp1252", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class Canvas:
+    """
+    Contenu d'une page PDF. Les coordonnées sont en points, ou dans le repère courant après `transform`.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ops = []
+        self.scale = 1
+
+    def save(self):
+        self.ops.append(b"q")
+
+    def restore(self):
+        self.ops.append(b"Q")
+
+    def transform(self, scale, tx, ty):
+        self.ops.append(f"{number(scale)} 0 0 {number(scale)} {number(tx)} {number(ty)} cm".encode())
+        self.scale *= scale
+
+    def clip(self, x0, y0, x1, y1):
+        self.ops.append(f"{number(x0)} {number(y0)} {number(x1 - x0)} {number(y1 - y0)} re W n".encode())
+
+    def _stroke_style(self, color, width, style):
+        r, g, b = COLORS[color]
+        w = width / self.scale
+        ops = [f"{number(r)} {number(g)} {number(b)} RG {number(w)} w 1 J 1 j"]
+        if style in DASHES:
+            ops.append("[" + " ".join(number(d / self.scale) for d in DASHES[style](width)) + "] 0 d")
+        else:
+            ops.append("[] 0 d")
+        self.ops.append(" ".join(ops).encode())
+
+    def line(self, points, color="black", width=0.5, style=None, cycle=False):
+        self._stroke_style(color, width, style)
+        xy = iter(points)
+        x, y = next(xy)
+        path = [f"{number(x)} {number(y)} m"]
+        path.extend(f"{number(x)} {number(y)} l" for x, y in xy)
+        path.append("s" if cycle else "S")
+        self.ops.append("\n".join(path).encode())
+
+    def rectangle(self, x0, y0, x1, y1, color="black", width=0.4, style=None, fill=None):
+        rect = f"{number(x0)} {number(y0)} {number(x1 - x0)} {number(y1 - y0)} re"
+        if fill:
+            r, g, b = COLORS[fill]
+            self.ops.append(f"{number(r)} {number(g)} {number(b)} rg".encode())
+        if color:
+            self._stroke_style(color, width, style)
+            self.ops.append(f"{rect} {'B' if fill else 'S'}".encode())
+        else:
+            self.ops.append(f"{rect} f".encode())
+
+    def text(self, x, y, text, size=10, color="black", font="F1", anchor="left"):
+        """
+        Texte sur la ligne de base y, aligné à gauche, au centre ou à droite de x.
+        """
+        size = size / self.scale
+        if anchor == "center":
+            x -= text_width(text, size) / 2
+        elif anchor == "right":
+            x -= text_width(text, size)
+        r, g, b = COLORS[color]
+        self.ops.append(
+            f"BT /{font} {number(size)} Tf {number(r)} {number(g)} {number(b)} rg {number(x)} {number(y)} Td (".encode() + _escape(text) + b") Tj ET"
+        )
+
+    def content(self):
+        return b"\n".join(self.ops)
+
+
+def write_pdf(path, pages):
+    """
+    Écrit le fichier PDF à partir de la liste des pages (Canvas).
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    tree = add(None)
+    fonts = {name: add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode()) for name, base in FONTS.items()}
+    resources = "<< /Font << " + " ".join(f"/{name} {ref} 0 R" for name, ref in fonts.items()) + " >> >>"
+
+    kids = []
+    for page in pages:
+        data = zlib.compress(page.content())
+        stream = add(f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode() + data + b"\nendstream")
+        kids.append(
+            add(
+                f"<< /Type /Page /Parent {tree} 0 R /MediaBox [0 0 {number(page.width)} {number(page.height)}] "
+                f"/Resources {resources} /Contents {stream} 0 R >>".encode()
+            )
+        )
+
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {tree} 0 R >>".encode()
+    objects[tree - 1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(objects):
+            offsets.append(f.tell())
+            f.write(f"{i + 1} 0 obj\n".encode() + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        f.writelines(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def tile_page(tile, elements, number):
+    """
+    Page d'une partie du modèle: cadre, numéro de page et éléments de l'image (en cm).
+    """
+    x0, y0, x1, y1, landscape = tile
+    width, height = (A4[1], A4[0]) if landscape else A4
+
+    page = Canvas(width, height)
+    page.save()
+
+    # le coin haut gauche de la zone (x0-0.5, y1+0.5) est placé dans le coin des marges
+    page.transform(CM, MARGIN - (x0 - 0.5) * CM, height - MARGIN - (y1 + 0.5) * CM)
+    page.clip(x0 - 0.5, y0 - 0.5, x1 + 0.5, y1 + 0.5)
+    page.rectangle(x0 - 0.5, y0 - 0.5, x1 + 0.5, y1 + 0.5, width=1, style="dashdotted")
+    page.text((x0 + x1) / 2, (y0 + y1) / 2 - 0.3, f"Page {number}", size=24.88, color="lightgray", anchor="center")
+    page.rectangle(x0, y0, x1, y1, color="gray", width=0.1, style="dashed")
+
+    for item in elements:
+        kind = item["kind"]
+        if kind == "line":
+            page.line(item["points"], item["color"], points(item.get("thickness", "0.5pt")), item.get("style"), item.get("cycle", False))
+        elif kind == "number":
+            # \tiny dans un rectangle blanc
+            x, y = item["at"]
+            w = (text_width(item["text"], 5) + 3.33) / CM
+            h = 6.9 / CM
+            page.rectangle(x - w / 2, y - h / 2, x + w / 2, y + h / 2, width=0.4, fill="white")
+            page.text(x, y - 1.8 / CM, item["text"], size=5, anchor="center")
+        elif kind == "angle":
+            x, y = item["at"]
+            page.text(x, y - 1.8 / CM, f"{item['text']}°", size=5, color="violet", anchor="center")
+
+    page.restore()
+    return page
+
+
+def _tables(pages, y, columns, rows):
+    """
+    Tableau des lignes `rows` en colonnes de 40 lignes, 3 par bande, à partir de la hauteur `y`
+    de la dernière page. Ajoute des pages si nécessaire.
+    """
+    width, height = A4
+    page = pages[-1]
+    row = 4.2 * MM
+    table_width = sum(w for _, w in columns)
+    pitch = (width - MARGIN - 10 * MM) / 3
+
+    tables = [rows[i : i + 40] for i in range(0, len(rows), 40)]
+    for band in range(0, len(tables), 3):
+        band_height = (1 + max(len(t) for t in tables[band : band + 3])) * row
+        if y - band_height < 10 * MM:
+            page = Canvas(width, height)
+            pages.append(page)
+            y = height - MARGIN
+
+        for k, table in enumerate(tables[band : band + 3]):
+            x = MARGIN + k * pitch
+            top = y
+            for r, values in enumerate([None] + table):
+                cells = [c for c, _ in columns] if values is None else list(map(str, values))
+                if values is not None and r % 2 == 1:
+                    page.rectangle(x, top - (r + 1) * row, x + table_width, top - r * row, color=None, fill="rowgray")
+                cx = x
+                for text, (_, w) in zip(cells, columns):
+                    page.text(cx + w - 1.2 * MM, top - (r + 1) * row + 1.2 * MM, text, size=8, font="F2" if values is None else "F1", anchor="right")
+                    cx += w
+
+            # filets: contour, sous l'en-tête, séparations des colonnes
+            bottom = top - (len(table) + 1) * row
+            page.rectangle(x, bottom, x + table_width, top, width=0.4)
+            page.line([(x, top - row), (x + table_width, top - row)], width=0.4)
+            cx = x
+            for _, w in columns[:-1]:
+                cx += w
+                page.line([(cx, top), (cx, bottom)], width=0.4)
+
+        y -= band_height + 5 * MM
+
+    return y
+
+
+def summary_pages(dimensions, infos, crossings, frame, cutting=None):
+    """
+    Pages des dimensions et du tableau des segments, puis du plan de débit `cutting` s'il est donné
+    (voir `corsebars.cutting_plan`).
+    """
+    dim_x, dim_y, mean_length, mean_length_real, segments = dimensions
+    width, height = A4
+
+    page = Canvas(width, height)
+    pages = [page]
+    y = height - MARGIN - 8 * MM
+
+    page.text(MARGIN, y, "Dimensions", size=14.4, font="F2")
+    y -= 8 * MM
+    lines = [
+        (f"Taille : {dim_x} cm × {dim_y} cm", "black"),
+        (f"Ratio x/y : {round(dim_x / dim_y, 4)}", "black"),
+        (f"Longueur contour : {mean_length} cm ({segments} segments)", "black"),
+        (f"Longueur profilé : {mean_length_real} cm (longueur moyenne + trait de coupe 2 mm)", "black"),
+    ]
+    if crossings:
+        xy = ", ".join(f"{c.segment}/{c.other}" + (" (contour)" if c.contour else "") for c in crossings)
+        lines.append((f"Croisements du bord intérieur : {xy}", "red"))
+    lines.append((f"Cadre : {frame[0]} cm × {frame[1]} cm", "black"))
+    for text, color in lines:
+        page.text(MARGIN, y, text, size=10, color=color)
+        y -= 5 * MM
+
+    y -= 6 * MM
+    page.text(MARGIN, y, "Segments", size=14.4, font="F2")
+    y -= 7 * MM
+    page.text(MARGIN, y, "Les angles sont donnés pour l'extrémité de fin du segment (donc avec le segment suivant).", size=10, font="F3")
+    y -= 6 * MM
+
+    columns = [("N", 9 * MM), ("Longueur", 18 * MM), ("Angle", 13 * MM), ("Coupe", 13 * MM)]
+    _tables(pages, y, columns, [(info[0], info[3], info[4], info[5]) for info in infos])
+
+    if cutting is not None:
+        pages.extend(cutting_pages(cutting))
+
+    return pages
+
+
+def cutting_pages(plan):
+    """
+    Pages du plan de débit des barres: résumé de chaque barre et tableau des pièces, barre par barre.
+    """
+    width, height = A4
+    page = Canvas(width, height)
+    pages = [page]
+    y = height - MARGIN - 8 * MM
+
+    page.text(MARGIN, y, "Débit des barres", size=14.4, font="F2")
+    y -= 8 * MM
+    page.text(MARGIN, y, f"Barres de {plan.bar:g} mm, trait de coupe {plan.kerf:g} mm : {len(plan.bars)} barre(s) (minimum {plan.lower_bound}), chute {plan.waste} mm", size=10)
+    y -= 5 * MM
+    for b, pieces in enumerate(plan.bars):
+        if y < 20 * MM:
+            page = Canvas(width, height)
+            pages.append(page)
+            y = height - MARGIN - 5 * MM
+        used = corsebars.used(pieces, plan.kerf)
+        page.text(MARGIN, y, f"Barre {b + 1} : {len(pieces)} pièce(s), {used} mm, chute {round(plan.bar - used, 1)} mm", size=10)
+        y -= 5 * MM
+    y -= 1 * MM
+    page.text(MARGIN, y, "Le débit est la longueur hors tout de la pièce, pointes des onglets comprises.", size=10, font="F3")
+    y -= 6 * MM
+
+    columns = [("Barre", 11 * MM), ("N", 9 * MM), ("Longueur", 18 * MM), ("Débit", 15 * MM)]
+    _tables(pages, y, columns, [(b + 1, p.segment, p.length, p.stock) for b, pieces in enumerate(plan.bars) for p in pieces])
+    return pages
@@ -4,235 +4,344 @@
 import argparse
 import operator
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageTk
 
+import corseprofile
 from corse_png import POINTS  # relevé des points dans l'image corse.png
+from corsecli import parse_values
+from corsegeo import geometry, simplify
+
+
+# en-tête du cartouche des dimensions, colonnes de la longueur et des angles (police à chasse fixe)
+HEADER = f"n°  long. angle coupe"
+COLUMN_LENGTH = 3
+COLUMN_ANGLES = 10
+
+HEIGHT = 1000  # hauteur de l'image en pleine résolution
+PREVIEW = 500  # hauteur de l'aperçu à l'écran
+
+
+class RenderSession:
+    """
+    Session de rendu de l'image du modèle, pour plusieurs tailles et épaisseurs.
+
+    Les polices sont chargées une fois, la taille des étiquettes est mesurée une fois, le fond
+    redimensionné est gardé en cache ainsi que le calque de ce qui ne dépend que des points
+    (cartouche sauf les longueurs, contour, numéros, angles). Un rendu ne dessine que le reste:
+    longueurs, traits de construction et de coupe, bord intérieur.
+
+    L'image est dessinée directement à la hauteur `height` (polices, épaisseurs des traits et
+    coordonnées mises à l'échelle), sans passer par la pleine résolution. `background` est le
+    chemin du fond ou une image déjà chargée, partageable entre plusieurs sessions.
+    """
+
+    def __init__(self, points=POINTS, show_background=False, background="corse.png", height=HEIGHT, verbose=True, texts=True):
+        self.show_background = show_background
+        self.background_path = background
+        self.height = height
+        self.scale = height / HEIGHT
+        self.verbose = verbose
+        self.texts = texts  # sans les textes (aperçu grossier), le rendu ne trace que des traits
+
+        self.font_number = ImageFont.truetype("HelveticaNeue.ttc", self.font_size(16))
+        self.font_angle = ImageFont.truetype("HelveticaNeue.ttc", self.font_size(20))
+        self.font_fixed = ImageFont.truetype("Menlo", self.font_size(17))
+
+        self._measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        self.advance = self.font_fixed.getlength("0")  # largeur d'un caractère du cartouche
+        self._sizes = {}
+        self._background = None
+        self._layer = None  # (points, image)
+        self._last = None  # (paramètres, image)
+
+        self.set_points(points)
+
+    def font_size(self, size):
+        return max(1, round(size * self.scale))
+
+    def line_width(self, width):
+        """
+        Épaisseur d'un trait de `width` pixels en pleine résolution.
+        """
+        return max(1, round(width * self.scale))
+
+    def set_points(self, points):
+        scale_x = 1876 / 1200  # les points sont pour une image de 1200 pixels de largeur
+        SIZE_X = 1876 / scale_x
+        SIZE_Y = 1024 / scale_x
+
+        scale_y = HEIGHT / SIZE_Y * self.scale
+        self.corse = [(x * scale_y, y * scale_y) for x, y in points]
+        self.size = (round(SIZE_X * scale_y), self.height)
+        self._layer = None
+        self._last = None
+
+        # boîtes des étiquettes
+        for i in range(len(self.corse)):
+            self.text_size(f"{i + 1}", self.font_number)
+
+    def text_size(self, text, font):
+        """
+        Dimensions du texte (comme l'ancien ImageDraw.textsize), mesurées une seule fois.
+        """
+        key = (text, id(font))
+        size = self._sizes.get(key)
+        if size is None:
+            size = self._sizes[key] = self._measure.textbbox((0, 0), text, font=font)[2:]
+        return size
+
+    def background(self):
+        if self._background is None:
+            if self.show_background:
+                image = self.background_path
+                if not isinstance(image, Image.Image):
+                    image = Image.open(image)
+                self._background = image.resize(self.size, Image.Resampling.BICUBIC)
+            else:
+                self._background = Image.new("RGB", size=self.size, color=(255, 255, 255))
+        return self._background
 
+    def layer(self, corse):
+        """
+        Fond et éléments qui ne dépendent que des points: cadre du cartouche, contour, numéros et angles.
+        """
+        key = tuple(corse)
+        if self._layer is not None and self._layer[0] == key:
+            return self._layer[1]
 
-def rotate(xy, radians):
-    c, s = np.cos(radians), np.sin(radians)
-    j = np.matrix([[c, s], [-s, c]])
-    m = np.dot(j, xy)
-    r_xy = float(m.T[0]), float(m.T[1])
-    return np.array(r_xy)
-
-
-def calcule(
-    width,
-    thickness,
-    show_background=False,
-    points=POINTS,
-):
-    scale_x = 1876 / 1200  # les points sont pour une image de 1200 pixels de largeur
-    SIZE_X = 1876 / scale_x
-    SIZE_Y = 1024 / scale_x
-
-    scale_y = 1000 / SIZE_Y
-    corse = [(x * scale_y, y * scale_y) for x, y in points]
-
-    if show_background:
-        image = Image.open("corse.png")
-        image = image.resize((round(SIZE_X * scale_y), 1000), Image.Resampling.BICUBIC)
-    else:
-        image = Image.new("RGB", size=(round(SIZE_X * scale_y), 1000), color=(255, 255, 255))
-
-    font_number = ImageFont.truetype("HelveticaNeue.ttc", 16)
-    font_angle = ImageFont.truetype("HelveticaNeue.ttc", 20)
-    font_fixed = ImageFont.truetype("Menlo", 17)
-
-    # recalcule les coordonnées des points dans l'image
-    image_width, image_height = image.size
-
-    # dimensions max de la Corse en pixels
-    dim_x = max(map(operator.itemgetter(0), corse)) - min(map(operator.itemgetter(0), corse))
-    dim_y = max(map(operator.itemgetter(1), corse)) - min(map(operator.itemgetter(1), corse))
-
-    # ajuste le coefficient d'échelle
-    scale_y = width / dim_x
-
-    # contexte PIL pour dessiner dans l'image
-    draw = ImageDraw.Draw(image)
-
-    # cartouche pour les dimensions
-    info = f"n°  long. angle coupe"
-    text_width, text_height = draw.textsize(info, font=font_fixed)
-    draw.rectangle(
-        (
-            0,
-            image_height - 1 - (len(corse) + 1) * text_height,
-            text_width + 2,
-            image_height,
-        ),
-        outline=(0, 0, 0),
-        width=1,
-        fill=(255, 255, 255),
-    )
-    draw.text(
-        (1, image_height - 1 - (len(corse) + 1) * text_height),
-        info,
-        font=font_fixed,
-        fill=(255, 0, 0),
-    )
-
-    # dessine le contour
-    corse.append(corse[0])
-    draw.line(corse, fill=(128, 128, 255), width=8)
-    corse.pop()
-
-    # pour écrire les informations sur chaque segment/sommet
-    # csv_writer = csv.writer(open("sommets.csv", "w"))
-
-    angles = []
-    total_length = 0
-
-    for i, p in enumerate(corse):
-        p1 = p
-        p2 = corse[(i + 1) % len(corse)]
-        p3 = corse[(i + 2) % len(corse)]
-
-        xy_middle = (p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2
-
-        v1 = np.array(p1) - np.array(p2)
-        v2 = np.array(p3) - np.array(p2)
-
-        u1 = v1 / np.linalg.norm(v1)
-        u2 = v2 / np.linalg.norm(v2)
-
-        angle = np.math.atan2(np.linalg.det([v1, v2]), np.dot(v1, v2))
-        angles.append(angle)
-
-        angle = np.degrees(angle)
-        length = np.linalg.norm(v1) * scale_y
-
-        total_length += length
-
-        if angle >= 0:
-            cut_angle = angle / 2  # angle saillant
-        else:
-            cut_angle = 180 + angle / 2  # angle rentrant
-
-        print(f"{(i + 1):2d} l={length:6.1f} 𝛼={angle:6.1f}° cut={cut_angle:6.1f}°")
+        image = self.background().copy()
+        image_height = image.height
+        draw = ImageDraw.Draw(image)
 
-        info = f"{(i + 1):2d} {length:6.1f} {angle:4.0f}° {cut_angle:4.0f}°"
-        draw.text(
-            (1, image_height - 1 - (len(corse) - i) * text_height),
-            info,
-            font=font_fixed,
-            fill=(0, 0, 0),
-        )
+        pad = 2 * self.scale  # marge des cadres
 
-        # row = [
-        #     i + 1,
-        #     round(p[0] * scale, 1),
-        #     round(p[1] * scale, 1),
-        #     round(length, 1),
-        #     round(angle, 1),
-        #     round(cut_angle, 1),
-        # ]
-        # csv_writer.writerow(row)
-
-        sz = draw.textsize(f"{i + 1}", font=font_number)
+        # cartouche pour les dimensions
+        text_width, text_height = self.text_size(HEADER, self.font_fixed)
         draw.rectangle(
             (
-                xy_middle[0] - sz[0] / 2 - 2,
-                xy_middle[1] - sz[1] / 2 - 2,
-                xy_middle[0] + sz[0] / 2 + 2,
-                xy_middle[1] + sz[1] / 2 + 2,
+                0,
+                image_height - 1 - (len(corse) + 1) * text_height,
+                text_width + pad,
+                image_height,
             ),
-            fill=(255, 255, 255),
             outline=(0, 0, 0),
             width=1,
+            fill=(255, 255, 255),
         )
+        if self.texts:
+            draw.text(
+                (1, image_height - 1 - (len(corse) + 1) * text_height),
+                HEADER,
+                font=self.font_fixed,
+                fill=(255, 0, 0),
+            )
+
+        # dessine le contour
+        draw.line(corse + corse[:1], fill=(128, 128, 255), width=self.line_width(8))
+
+        # les angles ne dépendent ni de la taille ni de l'épaisseur
+        geo = geometry(corse, 0, sens=-1, interior=False)
+        angles = np.degrees(geo.angles).tolist()
+        cut_angles = geo.cut_angles.tolist()
+
+        for i, p in enumerate(corse):
+            # cartouche, sauf la colonne des longueurs
+            if self.texts:
+                y = image_height - 1 - (len(corse) - i) * text_height
+                draw.text((1, y), f"{(i + 1):2d}", font=self.font_fixed, fill=(0, 0, 0))
+                draw.text((1 + COLUMN_ANGLES * self.advance, y), f"{angles[i]:4.0f}° {cut_angles[i]:4.0f}°", font=self.font_fixed, fill=(0, 0, 0))
+
+            p1 = p
+            p2 = corse[(i + 1) % len(corse)]
+
+            xy_middle = (p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2
+
+            sz = self.text_size(f"{i + 1}", self.font_number)
+            draw.rectangle(
+                (
+                    xy_middle[0] - sz[0] / 2 - pad,
+                    xy_middle[1] - sz[1] / 2 - pad,
+                    xy_middle[0] + sz[0] / 2 + pad,
+                    xy_middle[1] + sz[1] / 2 + pad,
+                ),
+                fill=(255, 255, 255),
+                outline=(0, 0, 0),
+                width=1,
+            )
+
+            if self.texts:
+                draw.text(
+                    (xy_middle[0] - sz[0] / 2, xy_middle[1] - sz[1] / 2),
+                    f"{i + 1}",
+                    align="center",
+                    fill=(0, 0, 0),
+                    font=self.font_number,
+                )
+
+                draw.text(p2, f"{angles[i]:.0f}°", align="center", fill=(0, 0, 0), font=self.font_angle)
+
+            draw.point(p1, fill=(0, 0, 0))
+
+        self._layer = (key, image)
+        return image
+
+    def cached(self, width, thickness, tolerance=0):
+        """
+        Vrai si le rendu pour ces paramètres est le dernier calculé.
+        """
+        return self._last is not None and self._last[0] == (width, thickness, tolerance)
+
+    def render(self, width, thickness, tolerance=0):
+        """
+        Image du modèle de `width` mm de largeur pour un profilé de `thickness` mm.
+        Le dernier rendu est réutilisé si les paramètres n'ont pas changé.
+        """
+        params = (width, thickness, tolerance)
+        if self.cached(*params):
+            return self._last[1]
+
+        corse = self.corse
+
+        # dimensions max de la Corse en pixels
+        dim_x = max(map(operator.itemgetter(0), corse)) - min(map(operator.itemgetter(0), corse))
+        dim_y = max(map(operator.itemgetter(1), corse)) - min(map(operator.itemgetter(1), corse))
+
+        # ajuste le coefficient d'échelle
+        scale_y = width / dim_x
+
+        # simplification du contour, tolérance en mm
+        if tolerance > 0:
+            keep, removed, deviation = simplify(corse, tolerance / scale_y)
+            if self.verbose:
+                print(f"simplification: {removed} sommet(s) supprimé(s) sur {len(corse)}, écart maximal {deviation * scale_y:.2f} mm")
+            corse = [corse[i] for i in keep.tolist()]
+
+        image = self.layer(corse).copy()
+        image_width, image_height = image.size
+
+        # contexte PIL pour dessiner dans l'image
+        draw = ImageDraw.Draw(image)
+        text_height = self.text_size(HEADER, self.font_fixed)[1]
+
+        # pour écrire les informations sur chaque segment/sommet
+        # csv_writer = csv.writer(open("sommets.csv", "w"))
+
+        # Nota: le polygone est orienté négativement
+        geo = geometry(corse, thickness / scale_y, sens=-1)
+
+        lengths = (geo.lengths * scale_y).tolist()
+        angles = np.degrees(geo.angles).tolist()
+        cut_angles = geo.cut_angles.tolist()
+        total_length = geo.length_contour * scale_y
+
+        for i, p in enumerate(corse):
+            angle = angles[i]
+            length = lengths[i]
+            cut_angle = cut_angles[i]
+
+            if self.verbose:
+                print(f"{(i + 1):2d} l={length:6.1f} 𝛼={angle:6.1f}° cut={cut_angle:6.1f}°")
+
+            # colonne des longueurs du cartouche
+            if self.texts:
+                draw.text(
+                    (1 + COLUMN_LENGTH * self.advance, image_height - 1 - (len(corse) - i) * text_height),
+                    f"{length:6.1f}",
+                    font=self.font_fixed,
+                    fill=(0, 0, 0),
+                )
+
+            # row = [
+            #     i + 1,
+            #     round(p[0] * scale, 1),
+            #     round(p[1] * scale, 1),
+            #     round(length, 1),
+            #     round(angle, 1),
+            #     round(cut_angle, 1),
+            # ]
+            # csv_writer.writerow(row)
+
+        interior = geo.interior.tolist()  # bord intérieur
+        normals = geo.normals.tolist()
+
+        for i, p in enumerate(corse):
+
+            # points origine et extrémité
+            p1 = p
+            p2 = corse[(i + 1) % len(corse)]
+
+            # traits de construction (pour vérifier les calculs!)
+            r1 = (p1[0] + normals[i][0], p1[1] + normals[i][1])
+            r2 = (p2[0] + normals[i][0], p2[1] + normals[i][1])
+            draw.line([p1, r1], fill=(0, 0, 0))
+            draw.line([p2, r2], fill=(0, 0, 0))
+            draw.line([r1, r2], fill=(0, 0, 0))
+
+            if angles[i] >= 0:
+                color = (255, 0, 0)  # coupe angle aigu
+            else:
+                color = (0, 255, 0)  # coupe angle obtus
 
-        draw.text(
-            (xy_middle[0] - sz[0] / 2, xy_middle[1] - sz[1] / 2),
-            f"{i + 1}",
-            align="center",
-            fill=(0, 0, 0),
-            font=font_number,
-        )
-
-        draw.text(p2, f"{angle:.0f}°", align="center", fill=(0, 0, 0), font=font_angle)
+            # trace le trait de coupe
+            draw.line([p2, tuple(interior[i])], fill=color)
 
-        draw.point(p1, fill=(0, 0, 0))
+        interior = list(map(tuple, interior))
+        interior.append(interior[0])
+        draw.line(interior, fill=(0, 0, 0), width=self.line_width(2))
 
-    interior = []  # bord intérieur
+        # la longueur du profilé est la longueur moyenne des bords extérieur et intérieur
+        mid_length = geo.mid_length * scale_y
 
-    for i, p in enumerate(corse):
+        if self.verbose:
+            print(f"overall width:  {width} mm")
+            print(f"outline length: {total_length:.0f} mm")
+            print(f"profile length: {mid_length:.0f} mm (thickness: {thickness} mm)")
+            # print(f"minimum length: {mid_length + thickness * 2 + len(corse) * 1.6:.0f} mm")
+            print(f"image size: {image.size}")
 
-        # points origine et extrémité
-        p1 = p
-        p2 = corse[(i + 1) % len(corse)]
+        # dimensions Corse et longueur du contour
+        if self.texts:
+            info = f"dim: {dim_x*scale_y:.1f} x {dim_y*scale_y:.1f} mm\ncontour: {total_length:.0f} mm\nthickness: {thickness} mm"
+            tw, th = self.text_size(info, self.font_fixed)
+            draw.text(
+                ((image_width - tw) / 2, (image_height - th) / 2),
+                info,
+                fill=(0, 0, 0),
+                font=self.font_fixed,
+                align="center",
+            )
 
-        # angles origine/extrémité
-        a1 = angles[(i - 1) % len(corse)]
-        a2 = angles[i]
+        self._last = (params, image)
+        return image
 
-        v = np.array(p1) - np.array(p2)  # Nota: le polygone est orienté négativement
-        u = v / np.linalg.norm(v) * thickness / scale_y
 
-        # traits de construction (pour vérifier les calculs!)
-        r = rotate(u, -np.pi / 2)
-        draw.line([p1, *(r + p1)], fill=(0, 0, 0))
-        draw.line([p2, *(r + p2)], fill=(0, 0, 0))
-        draw.line([*(r + p1), *(r + p2)], fill=(0, 0, 0))
+def calcule(
+    width,
+    thickness,
+    show_background=False,
+    points=POINTS,
+    tolerance=0,
+):
+    return RenderSession(points, show_background).render(width, thickness, tolerance)
 
-        if a2 >= 0:
-            color = (255, 0, 0)  # coupe angle aigu
-        else:
-            color = (0, 255, 0)  # coupe angle obtus
-
-        # trace le trait de coupe
-        xy = rotate(u / np.sin(a2 / 2), -a2 / 2) + p2
-        draw.line([p2, *xy], fill=color)
-
-        interior.append((*xy,))
-
-    interior.append(interior[0])
-    draw.line(interior, fill=(0, 0, 0), width=2)
-    interior.pop()
-
-    # la longueur du profilé est la longueur moyenne:
-    # - chaque bord est un trapèze, la surface du trapèze est (l1+l2)*h/2
-    # - la longueur du profilé est la surface du contour divisée par l'épaisseur
-    # - la surface du contour est la somme des surfaces des trapèzes, soit (∑(l1+l2))*h/2
-    # - et donc la longueur du profilé est ∑(l1+l2)/2
-    mid_length = 0
-    for i in range(len(corse)):
-        p1 = corse[i]
-        p2 = corse[(i + 1) % len(corse)]
-        v1 = np.array(p1) - np.array(p2)
-
-        p1 = interior[i]
-        p2 = interior[(i + 1) % len(corse)]
-        v2 = np.array(p1) - np.array(p2)
-        mid_length += np.linalg.norm(v1) + np.linalg.norm(v2)
-    mid_length = mid_length / 2 * scale_y
-
-    print(f"overall width:  {width} mm")
-    print(f"outline length: {total_length:.0f} mm")
-    print(f"profile length: {mid_length:.0f} mm (thickness: {thickness} mm)")
-    # print(f"minimum length: {mid_length + thickness * 2 + len(corse) * 1.6:.0f} mm")
-    print(f"image size: {image.size}")
-
-    # dimensions Corse et longueur du contour
-    info = f"dim: {dim_x*scale_y:.1f} x {dim_y*scale_y:.1f} mm\ncontour: {total_length:.0f} mm\nthickness: {thickness} mm"
-    tw, th = draw.textsize(info, font=font_fixed)
-    draw.text(
-        ((image_width - tw) / 2, (image_height - th) / 2),
-        info,
-        fill=(0, 0, 0),
-        font=font_fixed,
-        align="center",
-    )
 
-    return image
+def show_model(output=None, width=915, thickness=20, tolerance=0, progressive=True):
+    """
+    Affiche le modèle à la taille de l'aperçu, dessiné directement à cette résolution.
+    En mode progressif, un aperçu grossier (quart de la pleine résolution) est affiché tout de suite
+    puis remplacé par l'aperçu net. L'image en pleine résolution n'est calculée que pour l'enregistrer.
+    """
 
+    background = Image.open("corse.png")
+    background.load()  # décodé une fois pour toutes les sessions
 
-def show_model(output=None):
+    session = RenderSession(show_background=True, background=background, height=PREVIEW)
+    coarse = RenderSession(show_background=True, background=background, height=PREVIEW // 2, verbose=False, texts=False) if progressive else None
+    full = None
 
     root = tk.Tk()
 
@@ -243,17 +352,14 @@ def show_model(output=None):
 
     view = None
     image = None
-    image_raw = None
+    pending = None  # affinage de l'aperçu en attente
 
-    def upd():
-        nonlocal view, canvas, image, image_raw
+    def display(rendered):
+        nonlocal view, image
 
-        image = calcule(915, 20, True)
-        image_raw = image
-        sz = image.size
-
-        image = image.convert(mode="RGB")
-        image = image.resize(map(int, (1830 / 2, 1000 / 2)), Image.Resampling.BICUBIC)
+        image = rendered.convert(mode="RGB")
+        if image.size != session.size:
+            image = image.resize(session.size, Image.Resampling.NEAREST)  # aperçu grossier
         image = ImageTk.PhotoImage(image)
 
         if not view:
@@ -262,7 +368,27 @@ def show_model(output=None):
         else:
             view.configure(image=image)
 
+    def refine():
+        nonlocal pending
+        pending = None
+        display(session.render(width, thickness, tolerance))
+
+    def upd():
+        nonlocal pending
+
+        if pending is not None:
+            root.after_cancel(pending)
+            pending = None
+
+        if coarse is None or session.cached(width, thickness, tolerance):
+            refine()
+        else:
+            display(coarse.render(width, thickness, tolerance))
+            root.update_idletasks()
+            pending = root.after(1, refine)
+
     def callback(event):
+        nonlocal full, width, thickness
 
         if event.type == tk.EventType.Motion:
             return
@@ -270,8 +396,10 @@ def show_model(output=None):
         if event.keysym == "Escape" or event.keysym == "q" or event.keysym == "x":
             root.destroy()
         elif event.keysym == "s":
-            if output and image_raw:
-                image_raw.save(output)
+            if output:
+                if full is None:
+                    full = RenderSession(show_background=True, background=background, verbose=False)
+                full.render(width, thickness, tolerance).save(output)
                 print(f"saved to {output}")
             else:
                 print("no output file")
@@ -279,6 +407,13 @@ def show_model(output=None):
         elif event.keysym == "u":
             upd()
 
+        elif event.keysym in ("Up", "Down"):
+            width += 10 if event.keysym == "Up" else -10
+            upd()
+        elif event.keysym in ("Right", "Left"):
+            thickness = max(1, thickness + (1 if event.keysym == "Right" else -1))
+            upd()
+
     root.bind("<Key>", callback)
     root.bind("<Motion>", callback)
 
@@ -295,6 +430,12 @@ def main():
     )
     parse.add_argument("-m", "--model", action="store_true", help="affiche le modèle en fond")
     parse.add_argument("-o", "--output", type=Path, help="fichier PNG généré")
+    parse.add_argument("-n", "--net", action="store_true", help="aperçu net seulement, sans aperçu grossier préalable")
+    parse.add_argument("-t", "--tolerance", type=float, default=0, help="simplifie le contour avec une tolérance en mm")
+    parse.add_argument("-T", "--tailles", type=parse_values, help="une image par taille en cm (a,b,c ou début:fin:pas)")
+    parse.add_argument("-E", "--epaisseurs", type=parse_values, help="une image par épaisseur en mm (a,b,c ou début:fin:pas)")
+    parse.add_argument("--profile", type=Path, help="rapport JSON de la durée et de la mémoire de chaque phase")
+    parse.add_argument("--cprofile", type=Path, help="profil cProfile des phases Python")
     parse.add_argument(
         "scale",
         metavar="échelle",
@@ -314,16 +455,50 @@ def main():
 
     args = parse.parse_args()
 
-    if args.model:
-        show_model(args.output)
-    else:
-        image = calcule(args.scale * 10, args.thickness, args.model)
-
-        if args.output:
-            # image.putalpha(128)
-            image.save(args.output)
+    with corseprofile.session(args.profile, args.cprofile):
+        if args.tailles is not None or args.epaisseurs is not None:
+            # variantes: une seule session, seul le calque du modèle est redessiné
+            if not args.output:
+                parse.error("-T/-E nécessitent -o")
+            sizes = args.tailles if args.tailles is not None else [args.scale]
+            thicknesses = args.epaisseurs if args.epaisseurs is not None else [args.thickness]
+            with corseprofile.phase("session"):
+                session = RenderSession(show_background=args.model)
+            with ThreadPoolExecutor() as pool:
+                # l'encodage PNG (le plus long) se fait en parallèle du rendu suivant
+                futures = []
+                for size in sizes:
+                    for thickness in thicknesses:
+                        output = args.output.with_name(f"{args.output.stem}-{size:g}-{thickness:g}{args.output.suffix}")
+                        with corseprofile.phase("render"):
+                            image = session.render(size * 10, thickness, args.tolerance)
+                        futures.append((output, pool.submit(image.save, output)))
+                with corseprofile.phase("save", python=False):
+                    for output, future in futures:
+                        future.result()
+                        print(f"saved to {output}")
+                        corseprofile.count("png_bytes", output.stat().st_size)
+            corseprofile.count("images", len(futures))
+            corseprofile.count("segments", len(session.corse))
+        elif args.model:
+            with corseprofile.phase("viewer", python=False):
+                show_model(args.output, args.scale * 10, args.thickness, args.tolerance, progressive=not args.net)
         else:
-            image.show("Corse")
+            with corseprofile.phase("session"):
+                session = RenderSession()
+            with corseprofile.phase("render"):
+                image = session.render(args.scale * 10, args.thickness, args.tolerance)
+            corseprofile.count("images")
+            corseprofile.count("segments", len(session.corse))
+
+            if args.output:
+                # image.putalpha(128)
+                with corseprofile.phase("save"):
+                    image.save(args.output)
+                corseprofile.count("png_bytes", args.output.stat().st_size)
+            else:
+                with corseprofile.phase("viewer", python=False):
+                    image.show("Corse")
 
 
 if __name__ == "__main__":
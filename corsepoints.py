@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Fichiers de points: JSON (liste de [x, y]) ou binaire (.pts), projeté en mémoire.
+
+Format binaire, petit-boutiste: en-tête de 32 octets
+- signature b"CORSEPTS"
+- version (uint32)
+- type des coordonnées: b"<i4\\0" (entiers) ou b"<f8\\0" (flottants)
+- nombre de points (uint64)
+- 8 octets réservés
+suivi des coordonnées x0, y0, x1, y1... contiguës.
+"""
+
+import argparse
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"CORSEPTS"
+VERSION = 1
+HEADER = struct.Struct("<8sI4sQ8x")
+
+INT32 = np.iinfo(np.int32)
+
+
+def is_binary(path):
+    with Path(path).open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load(path):
+    """
+    Points du fichier (JSON ou binaire, reconnu à sa signature): tableau (N, 2).
+
+    Un fichier binaire est projeté en mémoire (lecture seule), sans copie ni conversion.
+    """
+    path = Path(path)
+    if not is_binary(path):
+        return from_list(json.loads(path.read_text()))
+
+    with path.open("rb") as f:
+        _, version, dtype, count = HEADER.unpack(f.read(HEADER.size))
+    if version != VERSION:
+        raise ValueError(f"{path}: version {version} du format de points non supportée")
+    dtype = np.dtype(dtype.rstrip(b"\0").decode())
+    if count == 0:
+        return np.empty((0, 2), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count, 2))
+
+
+def from_list(points):
+    """
+    Tableau (N, 2) d'une liste de [x, y]: entiers 32 bits si toutes les coordonnées sont entières
+    et représentables, flottants 64 bits sinon.
+    """
+    xy = np.asarray(points).reshape(-1, 2)
+    if xy.dtype.kind in "iu" and (len(xy) == 0 or (xy.min() >= INT32.min and xy.max() <= INT32.max)):
+        return xy.astype(np.int32)
+    return xy.astype(np.float64)
+
+
+def to_list(points):
+    """
+    Liste de [x, y] d'un tableau: les flottants entiers (exactement représentables) sont écrits comme des entiers.
+    """
+    xy = np.asarray(points)
+    if xy.dtype.kind in "iu":
+        return xy.tolist()
+    return [[int(v) if v.is_integer() and abs(v) < 2**53 else v for v in p] for p in xy.tolist()]
+
+
+def save(path, points):
+    """
+    Enregistre les points: format binaire si l'extension est .pts, JSON sinon.
+    """
+    path = Path(path)
+    if path.suffix != ".pts":
+        path.write_text(json.dumps(to_list(points)))
+        return
+
+    xy = np.asarray(points)
+    if xy.dtype != np.int32 and xy.dtype != np.float64:
+        xy = from_list(xy)
+    xy = np.ascontiguousarray(xy.reshape(-1, 2), dtype=xy.dtype.newbyteorder("<"))
+    with path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, xy.dtype.str.encode(), len(xy)))
+        f.write(xy.tobytes())
+
+
+def main():
+
+    parse = argparse.ArgumentParser(
+        description="Convertit des fichiers de points entre JSON et binaire (.pts)",
+        formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=30),
+    )
+    parse.add_argument("source", type=Path, help="fichier de points (JSON ou binaire)")
+    parse.add_argument("destination", type=Path, nargs="?", help="fichier converti (défaut: source avec l'autre extension)")
+
+    args = parse.parse_args()
+
+    destination = args.destination
+    if destination is None:
+        destination = args.source.with_suffix(".json" if is_binary(args.source) else ".pts")
+    points = load(args.source)
+    save(destination, points)
+    print(f"{destination}: {len(points)} points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Mesure des phases d'une exécution: durée, pic de mémoire et compteurs, écrits dans un rapport JSON,
+et profil cProfile optionnel des phases Python.
+
+Les fonctions instrumentées appellent `phase()` et `count()`, qui ne font rien tant qu'aucun profil
+n'est actif (voir `start`).
+"""
+
+import cProfile
+import json
+import pstats
+import statistics
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+FORMAT = 1  # format du rapport
+
+_active = None  # profil en cours
+
+
+def _maxrss(children=False):
+    """
+    Pic de mémoire résidente du processus (ou de ses sous-processus) en octets, None si le module
+    resource n'existe pas (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _reset_peak():
+    """
+    Remet à zéro le pic de mémoire résidente du processus (Linux). Faux si ce n'est pas possible.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return _maxrss()
+
+
+class Profile:
+    """
+    Phases d'une exécution. Une phase peut être parcourue plusieurs fois: les durées s'additionnent
+    et le pic de mémoire est le maximum. Les phases ne s'imbriquent pas: une phase ouverte dans une autre
+    est comptée dans la première.
+
+    Le pic de mémoire est celui de la mémoire résidente du processus, sans surcoût (tracemalloc ralentit
+    d'un ordre de grandeur le code Python). Sous Linux, il est remis à zéro au début de chaque phase
+    (uniquement quand un profil est actif); ailleurs c'est le pic depuis le début du processus
+    (`peak_per_phase` faux dans le rapport), ou None s'il n'est pas disponible.
+    Les phases qui lancent des sous-processus (LaTeX, visionneuse) sont marquées `python=False`:
+    elles ne sont pas profilées par cProfile, la mémoire des sous-processus est dans `children_maxrss_bytes`.
+    """
+
+    def __init__(self, cprofile=False):
+        self.phases = {}
+        self.counts = {}
+        self.profiler = cProfile.Profile() if cprofile else None
+        self.current = None
+        self.peak_per_phase = _reset_peak()
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    @contextmanager
+    def phase(self, name, python=True):
+        if self.current is not None:
+            yield
+            return
+
+        self.current = name
+        if self.peak_per_phase:
+            _reset_peak()
+        profiler = self.profiler if python else None
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+            peak = _peak()
+            self.current = None
+
+            p = self.phases.setdefault(name, dict(seconds=0, peak_bytes=None, calls=0))
+            p["seconds"] += seconds
+            if peak is not None:
+                p["peak_bytes"] = max(p["peak_bytes"] or 0, peak)
+            p["calls"] += 1
+
+    def count(self, name, value):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def report(self):
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.start
+        return dict(
+            format=FORMAT,
+            argv=sys.argv,
+            seconds=round(seconds, 6),
+            phases={name: dict(p, seconds=round(p["seconds"], 6)) for name, p in self.phases.items()},
+            counts=self.counts,
+            peak_per_phase=self.peak_per_phase,
+            maxrss_bytes=_maxrss(),
+            children_maxrss_bytes=_maxrss(children=True),
+        )
+
+    def write(self, path):
+        path.write_text(json.dumps(self.report(), indent=2) + "\n")
+
+    def dump(self, path):
+        """
+        Enregistre le profil cProfile (lisible avec pstats ou snakeviz).
+        """
+        self.profiler.dump_stats(path)
+
+
+def start(cprofile=False):
+    """
+    Active un nouveau profil: les phases et compteurs suivants y sont enregistrés.
+    """
+    global _active
+    _active = Profile(cprofile)
+    return _active
+
+
+def stop():
+    """
+    Désactive le profil en cours et le retourne.
+    """
+    global _active
+    profile, _active = _active, None
+    if profile is not None:
+        profile.seconds = time.perf_counter() - profile.start
+    return profile
+
+
+@contextmanager
+def session(report=None, cprofile=None):
+    """
+    Profil actif le temps du contexte si `report` (rapport JSON) ou `cprofile` (profil cProfile)
+    est donné, écrit à la sortie du contexte, y compris sur erreur ou exit().
+    """
+    if not report and not cprofile:
+        yield None
+        return
+
+    profile = start(cprofile is not None)
+    try:
+        yield profile
+    finally:
+        stop()
+        if report:
+            profile.write(report)
+            print(f"profil écrit dans {report}")
+        if cprofile:
+            profile.dump(cprofile)
+
+
+def phase(name, python=True):
+    """
+    Contexte qui mesure la phase `name` du profil en cours.
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name, python)
+
+
+def count(name, value=1):
+    """
+    Ajoute `value` au compteur `name` du profil en cours.
+    """
+    if _active is not None:
+        _active.count(name, value)
+
+
+def aggregate(reports):
+    """
+    Statistiques de plusieurs rapports (traitement par lots): pour chaque phase, nombre d'exécutions,
+    durées totale, moyenne, médiane, 95e centile et maximale, pic de mémoire maximal; total des compteurs.
+    """
+    phases = {}
+    for report in reports:
+        for name, p in report["phases"].items():
+            phases.setdefault(name, []).append(p)
+
+    summary = {}
+    for name, items in phases.items():
+        seconds = sorted(p["seconds"] for p in items)
+        summary[name] = dict(
+            runs=len(items),
+            total=round(sum(seconds), 6),
+            mean=round(statistics.fmean(seconds), 6),
+            median=round(statistics.median(seconds), 6),
+            p95=round(seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))], 6),
+            max=round(seconds[-1], 6),
+            peak_bytes=max((p["peak_bytes"] for p in items if p["peak_bytes"] is not None), default=None),
+        )
+
+    counts = {}
+    for report in reports:
+        for name, value in report["counts"].items():
+            counts[name] = counts.get(name, 0) + value
+
+    seconds = [r["seconds"] for r in reports]
+    return dict(
+        format=FORMAT,
+        runs=len(reports),
+        seconds=dict(total=round(sum(seconds), 6), mean=round(statistics.fmean(seconds), 6) if seconds else 0, max=round(max(seconds, default=0), 6)),
+        phases=summary,
+        counts=counts,
+    )
+
+
+def merge_stats(files, path):
+    """
+    Fusionne des profils cProfile en un seul fichier.
+    """
+    stats = pstats.Stats(*map(str, files))
+    stats.dump_stats(path)
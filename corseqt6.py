@@ -4,15 +4,282 @@
 import argparse
 import json
 import math
+import os
 import sys
+import time
+from collections import OrderedDict, defaultdict
 from pathlib import Path
 
-from PySide6.QtCore import QPoint, Qt
-from PySide6.QtGui import QKeySequence, QPainter, QPen, QPixmap, QPolygon, QShortcut, QMouseEvent
-from PySide6.QtWidgets import QApplication, QFileDialog, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+from PySide6.QtCore import QObject, QPoint, QPointF, QRect, QRunnable, QSize, Qt, QThreadPool, Signal
+from PySide6.QtGui import QKeySequence, QPainter, QPen, QPixmap, QPolygonF, QShortcut, QMouseEvent, QTransform
+from PySide6.QtWidgets import QApplication, QFileDialog, QHBoxLayout, QLabel, QSizePolicy, QVBoxLayout, QWidget
+
+import corsepoints
+import corsetex
+import corsetrace
+from corsetiles import Pyramid
+
+
+class PointGrid:
+    """
+    Index des sommets et des milieux des segments sur une grille régulière, pour retrouver
+    en temps constant le point sous le curseur. Mis à jour point par point.
+    """
+
+    def __init__(self, cell=8):
+        self.cell = cell
+        self.cells = defaultdict(set)
+        self.where = {}
+
+    def add(self, key, x, y):
+        c = (int(x // self.cell), int(y // self.cell))
+        self.cells[c].add(key)
+        self.where[key] = (x, y, c)
+
+    def remove(self, key):
+        _, _, c = self.where.pop(key)
+        self.cells[c].discard(key)
+        if not self.cells[c]:
+            del self.cells[c]
+
+    def move(self, key, x, y):
+        self.remove(key)
+        self.add(key, x, y)
+
+    def nearest(self, x, y, radius):
+        """
+        Clé du point le plus proche de (x, y), à une distance de Manhattan inférieure à `radius`, None sinon.
+        """
+        best, best_d = None, radius
+        cx0, cy0 = int((x - radius) // self.cell), int((y - radius) // self.cell)
+        cx1, cy1 = int((x + radius) // self.cell), int((y + radius) // self.cell)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    px, py, _ = self.where[key]
+                    d = abs(px - x) + abs(py - y)
+                    # à distance égale, le sommet est prioritaire sur le milieu
+                    if d < best_d or (d == best_d and best is not None and key[0] == "v" and best[0] == "m"):
+                        best, best_d = key, d
+        return best
+
+
+class Journal:
+    """
+    Sauvegarde automatique des modifications du contour, dans le répertoire `.corse-autosave` à côté
+    du fichier des points: instantané `<points>.snapshot` et journal `<points>.journal`, une opération
+    JSON par ligne, ajoutée et écrite sur le disque (fsync) après chaque modification.
+
+    Opérations:
+    - {"op": "move", "i": i, "from": [x, y], "to": [x, y]}: déplacement du sommet i
+    - {"op": "insert", "i": i, "point": [x, y]}: insertion d'un sommet en position i
+    - {"op": "delete", "i": i, "point": [x, y]}: suppression du sommet i
+    - {"op": "points", "from": [...], "to": [...]}: remplacement du contour (réinitialisation, chargement)
+
+    Le journal est régulièrement compacté dans l'instantané. L'instantané et la première ligne du journal
+    portent le même numéro: un journal qui ne correspond pas à l'instantané (arrêt pendant le compactage)
+    est ignoré.
+    """
+
+    COMPACT = 500  # nombre d'opérations avant compactage
+    DIRECTORY = ".corse-autosave"
+
+    def __init__(self, points_path: Path):
+        self.directory = points_path.parent / self.DIRECTORY
+        self.snapshot = self.directory / f"{points_path.name}.snapshot"
+        self.path = self.directory / f"{points_path.name}.journal"
+        self.file = None
+        self.count = 0
+
+    def record(self, op, points):
+        """
+        Ajoute l'opération au journal. `points` retourne le contour courant (opération appliquée),
+        il n'est appelé que pour écrire l'instantané.
+        """
+        if self.file is None or self.count >= self.COMPACT:
+            self.compact(points())
+            return
+        self._append(op)
+        self.count += 1
+
+    def _append(self, op):
+        self.file.write(json.dumps(op) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def compact(self, points):
+        """
+        Écrit l'instantané du contour et vide le journal.
+        """
+        serial = time.time_ns()
+        self.directory.mkdir(exist_ok=True)
+        tmp = self.snapshot.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            f.write(json.dumps({"serial": serial, "points": points}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot)
+        _fsync_directory(self.directory)
+
+        if self.file is not None:
+            self.file.close()
+        self.file = self.path.open("w")
+        self._append({"serial": serial})
+        self.count = 0
+
+    def discard(self):
+        """
+        Supprime la sauvegarde automatique (le contour vient d'être enregistré).
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.snapshot.unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+        try:
+            self.directory.rmdir()
+        except OSError:
+            pass  # absent ou sauvegarde d'autres fichiers de points
+
+    @staticmethod
+    def apply(points, op, undo=False):
+        """
+        Applique l'opération (ou son inverse) à une liste de points [x, y].
+        """
+        if op["op"] in ("move", "points"):
+            value = op["from"] if undo else op["to"]
+            if op["op"] == "move":
+                points[op["i"]] = value
+            else:
+                points[:] = value
+        elif (op["op"] == "insert") != undo:
+            points.insert(op["i"], op["point"])
+        else:
+            del points[op["i"]]
+        return points
+
+    def recover(self, points_path: Path):
+        """
+        Contour de la sauvegarde automatique si elle est plus récente que le fichier des points, None sinon.
+        """
+        if not self.snapshot.exists():
+            return None
+        if points_path.exists() and points_path.stat().st_mtime >= max(self.snapshot.stat().st_mtime, self.path.stat().st_mtime if self.path.exists() else 0):
+            return None
+
+        snapshot = json.loads(self.snapshot.read_text())
+        points = snapshot["points"]
+        lines = self.path.read_text().splitlines() if self.path.exists() else []
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != {"serial": snapshot["serial"]}:
+            return points  # journal de l'instantané précédent ou vide
+
+        for line in lines[1:]:
+            try:
+                op = json.loads(line)
+            except ValueError:
+                break  # dernière ligne incomplète (arrêt brutal)
+            self.apply(points, op)
+        return points
+
+
+def _fsync_directory(directory: Path):
+    """
+    Écrit sur le disque l'entrée d'un fichier renommé dans `directory` (sans effet sous Windows).
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StatsTask(QRunnable):
+    """
+    Calcul des statistiques du modèle dans un thread du pool (voir corsetex.statistics).
+    """
+
+    def __init__(self, polygon, width, thickness, done):
+        super().__init__()
+        self.polygon = polygon
+        self.width = width
+        self.thickness = thickness
+        self.done = done
+
+    def run(self):
+        points = list((p.x(), p.y()) for p in self.polygon)
+        try:
+            result = corsetex.statistics(self.width, self.thickness, points) if len(points) > 2 else None
+        except Exception as e:
+            result = e
+        self.done.emit(result)
+
+
+class LiveStats(QObject):
+    """
+    Statistiques du modèle recalculées en arrière-plan après chaque modification du contour.
+
+    Un seul calcul à la fois: les modifications faites pendant un calcul sont regroupées
+    et seul le dernier état du contour est calculé ensuite.
+    """
+
+    done = Signal(object)
+
+    def __init__(self, width, thickness, show):
+        super().__init__()
+        self.width = width  # taille du modèle (cm)
+        self.thickness = thickness  # épaisseur du profilé (cm)
+        self.show = show
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.pending = None
+        self.running = False
+        self.done.connect(self.finished)
+
+    def request(self, polygon):
+        # copie partagée: le contour n'est recopié qu'à sa prochaine modification
+        self.pending = QPolygonF(polygon)
+        if not self.running:
+            self.start()
+
+    def start(self):
+        polygon, self.pending = self.pending, None
+        self.running = True
+        self.pool.start(StatsTask(polygon, self.width, self.thickness, self.done))
+
+    def finished(self, result):
+        self.running = False
+        if self.pending is not None:
+            self.start()
+        self.show(result)
+
+    def wait(self):
+        self.pool.waitForDone()
+
+
+def _coord(v):
+    v = round(v, 2)
+    return int(v) if v == int(v) else v
 
 
 class LineLabel(QLabel):
+    """
+    Éditeur du contour sur l'image affichée par tuiles (voir corsetiles.Pyramid).
+
+    Les points sont dans le repère des fichiers de points (image réduite à corsetrace.SIZE pixels),
+    sans conversion: un contour enregistré sans modification est inchangé. L'affichage est une vue
+    de `zoom` pixels d'écran par pixel de l'image en pleine résolution, dont le coin haut-gauche
+    est le point (ox, oy) de l'image.
+    """
+
     x0 = 0
     y0 = 0
     x1 = 0
@@ -20,22 +287,393 @@ class LineLabel(QLabel):
     flag = False
     move_event = None
     info_event = None
-    points = QPolygon()
+    edit_event = None
+    points = QPolygonF()
     measure_mode = True
     edit_mode = False
     edit_point = -1
     insert_point = -1
 
-    def __init__(self, parent, points):
+    # calque en cache: image, contour et repères, sans le sommet déplacé (dragged)
+    layer = None
+    dragged = -1
+
+    # sauvegarde automatique et historique des opérations (voir Journal)
+    journal = None
+    drag_start = None
+
+    # vue: zoom (None tant que la taille n'est pas connue) et origine, déplacement en cours
+    zoom = None
+    ox = 0.0
+    oy = 0.0
+    panning = None
+
+    MARGIN = 8  # rayon des repères + épaisseur du trait
+    RADIUS = 5  # rayon des repères, en pixels d'écran
+    TILES = 256  # nombre de tuiles gardées en mémoire
+
+    def __init__(self, parent, points, pyramid: Pyramid):
         super().__init__(parent)
+        self.pen_contour = QPen(Qt.red, 2, Qt.SolidLine)
+        self.pen_vertex = QPen(Qt.blue, 2, Qt.SolidLine)
+        self.pen_middle = QPen(Qt.yellow, 2, Qt.SolidLine)
+        self.pen_measure = QPen(Qt.blue, 2, Qt.SolidLine)
+        for pen in (self.pen_contour, self.pen_vertex, self.pen_middle, self.pen_measure):
+            pen.setCosmetic(True)  # épaisseur indépendante du zoom
+        self.pyramid = pyramid
+        self.tile_cache = OrderedDict()
+        # pixels du repère des fichiers de points par pixel de l'image
+        self.reference = min(corsetrace.SIZE / pyramid.width, corsetrace.SIZE / pyramid.height)
         self.default_points = points
-        self.points = QPolygon(self.default_points)
+        self.set_polygon(QPolygonF(self.default_points))
+        self.undo_stack = []
+        self.redo_stack = []
         self.setMouseTracking(True)
 
+    def set_polygon(self, polygon):
+        """
+        Remplace le contour et reconstruit l'index des sommets et des milieux.
+
+        Chaque sommet a un identifiant stable: `ids[i]` est l'identifiant du sommet i et `position[h]`
+        la position du sommet h. Dans l'index, ("m", h) est le milieu du segment qui se termine au sommet h.
+        """
+        self.points = polygon
+        self.invalidate()
+        self.ids = list(range(polygon.size()))
+        self.position = {h: i for i, h in enumerate(self.ids)}
+        self.next_id = polygon.size()
+        self.grid = PointGrid(cell=8)
+        for i in range(polygon.size()):
+            self.index_point(i, add=True)
+
+    def index_point(self, i, add=False):
+        """
+        Met à jour dans l'index le sommet i et le milieu du segment qui se termine en i.
+        """
+        n = self.points.size()
+        h = self.ids[i]
+        p = self.points[i]
+        q = self.points[(i - 1) % n]
+        update = self.grid.add if add else self.grid.move
+        update(("v", h), p.x(), p.y())
+        update(("m", h), (p.x() + q.x()) / 2, (p.y() + q.y()) / 2)
+
+    def move_point(self, i, point):
+        self.points[i] = point
+        self.index_point(i)
+        self.index_point((i + 1) % self.points.size())
+
+    def insert_at(self, i, point):
+        self.points.insert(i, point)
+        self.ids.insert(i, self.next_id)
+        self.next_id += 1
+        self.renumber(i)
+        self.index_point(i, add=True)
+        self.index_point((i + 1) % self.points.size())
+
+    def remove_at(self, i):
+        h = self.ids.pop(i)
+        del self.position[h]
+        self.renumber(i)
+        self.grid.remove(("v", h))
+        self.grid.remove(("m", h))
+        self.points.remove(i)
+        self.index_point(i % self.points.size())
+
+    def renumber(self, start):
+        """
+        Met à jour la position des sommets à partir de `start` (après une insertion ou une suppression).
+        """
+        for i in range(start, len(self.ids)):
+            self.position[self.ids[i]] = i
+
+    def point_list(self):
+        return list([_coord(p.x()), _coord(p.y())] for p in self.points)
+
+    def apply(self, op, undo=False):
+        """
+        Applique l'opération (ou son inverse) au contour.
+        """
+        if op["op"] == "move":
+            self.move_point(op["i"], QPointF(*(op["from"] if undo else op["to"])))
+        elif op["op"] == "points":
+            self.set_polygon(QPolygonF([QPointF(*p) for p in (op["from"] if undo else op["to"])]))
+        elif (op["op"] == "insert") != undo:
+            self.insert_at(op["i"], QPointF(*op["point"]))
+        else:
+            self.remove_at(op["i"])
+        self.edit_point = -1
+        self.insert_point = -1
+        self.invalidate()
+        self.changed()
+
+    def changed(self):
+        """
+        Le contour a été modifié (y compris pendant un déplacement).
+        """
+        if self.edit_event:
+            self.edit_event(self.points)
+
+    def record(self, op):
+        """
+        Enregistre une opération déjà appliquée: historique et journal.
+        """
+        self.changed()
+        self.undo_stack.append(op)
+        self.redo_stack.clear()
+        if self.journal is not None:
+            self.journal.record(op, self.point_list)
+
+    def undo(self):
+        if self.undo_stack:
+            op = self.undo_stack.pop()
+            self.apply(op, undo=True)
+            self.redo_stack.append(op)
+            if self.journal is not None:
+                self.journal.record(self.inverse(op), self.point_list)
+
+    def redo(self):
+        if self.redo_stack:
+            op = self.redo_stack.pop()
+            self.apply(op)
+            self.undo_stack.append(op)
+            if self.journal is not None:
+                self.journal.record(op, self.point_list)
+
+    @staticmethod
+    def inverse(op):
+        if op["op"] == "move":
+            return dict(op, **{"from": op["to"], "to": op["from"]})
+        if op["op"] == "insert":
+            return dict(op, op="delete")
+        if op["op"] == "delete":
+            return dict(op, op="insert")
+        return dict(op, **{"from": op["to"], "to": op["from"]})
+
+    def invalidate(self):
+        """
+        Le calque doit être redessiné entièrement (contour modifié, changement de mode...).
+        """
+        self.layer = None
+        self.dragged = -1
+        self.update()
+
+    def sizeHint(self):
+        # taille de l'image réduite à corsetrace.SIZE pixels
+        return QSize(round(self.pyramid.width * self.reference), round(self.pyramid.height * self.reference))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.zoom is None:
+            self.fit()
+        self.invalidate()
+
+    def transform(self):
+        """
+        Passage des pixels de l'image aux pixels de l'écran.
+        """
+        return QTransform(self.zoom, 0, 0, self.zoom, -self.ox * self.zoom, -self.oy * self.zoom)
+
+    def points_transform(self):
+        """
+        Passage du repère des points aux pixels de l'écran.
+        """
+        z = self.zoom / self.reference
+        return QTransform(z, 0, 0, z, -self.ox * self.zoom, -self.oy * self.zoom)
+
+    def to_image(self, pos):
+        return QPoint(round(pos.x() / self.zoom + self.ox), round(pos.y() / self.zoom + self.oy))
+
+    def to_points(self, pos):
+        """
+        Position de l'écran dans le repère des points (au centième de pixel).
+        """
+        return QPointF(_coord((pos.x() / self.zoom + self.ox) * self.reference), _coord((pos.y() / self.zoom + self.oy) * self.reference))
+
+    def fit_zoom(self):
+        return min(self.width() / self.pyramid.width, self.height() / self.pyramid.height)
+
+    def fit(self):
+        """
+        Affiche l'image entière, centrée.
+        """
+        self.zoom = self.fit_zoom()
+        self.ox = (self.pyramid.width - self.width() / self.zoom) / 2
+        self.oy = (self.pyramid.height - self.height() / self.zoom) / 2
+        self.invalidate()
+
+    def zoom_at(self, pos, factor):
+        """
+        Change le zoom en gardant fixe le point de l'image sous `pos`.
+        """
+        zoom = min(max(self.zoom * factor, self.fit_zoom() / 4), 16)
+        x, y = pos.x() / self.zoom + self.ox, pos.y() / self.zoom + self.oy
+        self.zoom = zoom
+        self.ox = x - pos.x() / zoom
+        self.oy = y - pos.y() / zoom
+        self.invalidate()
+
+    def pan(self, dx, dy):
+        """
+        Déplace la vue de (dx, dy) pixels d'écran: le calque est décalé et seules
+        les bandes découvertes sont redessinées.
+        """
+        self.ox -= dx / self.zoom
+        self.oy -= dy / self.zoom
+        if self.layer is None:
+            self.update()
+            return
+        self.layer.scroll(dx, dy, self.layer.rect())
+        w, h = self.width(), self.height()
+        if dx:
+            self.draw_layer(QRect(0 if dx > 0 else w + dx, 0, abs(dx), h))
+        if dy:
+            self.draw_layer(QRect(0, 0 if dy > 0 else h + dy, w, abs(dy)))
+        self.update()
+
+    def wheelEvent(self, event):
+        if not self.flag:
+            self.zoom_at(event.position(), 1.25 ** (event.angleDelta().y() / 120))
+
+    def vertex_rect(self, i):
+        """
+        Zone de l'écran occupée par le sommet i, ses deux segments et leurs repères.
+        """
+        n = self.points.size()
+        polygon = QPolygonF([self.points[(i - 1) % n], self.points[i], self.points[(i + 1) % n]])
+        return self.points_transform().mapRect(polygon.boundingRect()).toAlignedRect().adjusted(-self.MARGIN, -self.MARGIN, self.MARGIN, self.MARGIN)
+
+    def measure_rect(self):
+        rect = QRect(QPoint(self.x0, self.y0), QPoint(self.x1, self.y1)).normalized()
+        return self.transform().mapRect(rect).adjusted(-self.MARGIN, -self.MARGIN, self.MARGIN, self.MARGIN)
+
+    def begin_drag(self, i):
+        """
+        Le sommet i va être déplacé: il est retiré du calque et dessiné à part.
+        """
+        self.layer = None
+        self.dragged = i
+        self.update()
+
+    def end_drag(self):
+        """
+        Fin du déplacement: le sommet est ajouté au calque à sa nouvelle position.
+        """
+        if self.layer is not None and self.dragged >= 0:
+            with QPainter(self.layer) as painter:
+                self.draw_vertex(painter, self.dragged)
+
+        # une seule opération pour tout le déplacement (ou l'insertion)
+        if self.drag_start is not None:
+            i, start = self.drag_start
+            p = self.points[i]
+            if start is None:
+                self.record({"op": "insert", "i": i, "point": [_coord(p.x()), _coord(p.y())]})
+            elif start != p:
+                self.record({"op": "move", "i": i, "from": [_coord(start.x()), _coord(start.y())], "to": [_coord(p.x()), _coord(p.y())]})
+            self.drag_start = None
+
+        self.dragged = -1
+
+    def tile(self, level, col, row):
+        """
+        Tuile de la pyramide, chargée à la demande (cache LRU de TILES tuiles).
+        """
+        key = (level, col, row)
+        pixmap = self.tile_cache.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(self.pyramid.path(level, col, row).as_posix())
+            self.tile_cache[key] = pixmap
+            if len(self.tile_cache) > self.TILES:
+                self.tile_cache.popitem(last=False)
+        else:
+            self.tile_cache.move_to_end(key)
+        return pixmap
+
+    def draw_tiles(self, painter, rect):
+        """
+        Dessine les tuiles de l'image visibles dans la zone `rect` de l'écran.
+        """
+        level = self.pyramid.level(self.zoom)
+        z, ox, oy = self.zoom, self.ox, self.oy
+        x0, y0 = rect.left() / z + ox, rect.top() / z + oy
+        x1, y1 = (rect.right() + 1) / z + ox, (rect.bottom() + 1) / z + oy
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for col, row, (x, y, w, h) in self.pyramid.tiles(level, x0, y0, x1, y1):
+            pixmap = self.tile(level, col, row)
+            if pixmap.isNull():
+                continue
+            # bords arrondis de la même façon pour des tuiles voisines: pas de jointure visible
+            left, top = round((x - ox) * z), round((y - oy) * z)
+            right, bottom = round((x + w - ox) * z), round((y + h - oy) * z)
+            painter.drawPixmap(QRect(left, top, right - left, bottom - top), pixmap, pixmap.rect())
+
+    def draw_layer(self, rect=None):
+        """
+        Dessine le calque (ou seulement la zone `rect` de l'écran): tuiles de l'image,
+        contour et repères du mode Edition, sauf le sommet déplacé.
+        """
+        if rect is None:
+            self.layer = QPixmap(self.size())
+            rect = self.layer.rect()
+        n = self.points.size()
+        i = self.dragged
+        r = self.RADIUS / self.zoom * self.reference
+
+        with QPainter(self.layer) as painter:
+            painter.setClipRect(rect)
+            painter.fillRect(rect, self.palette().window().color())
+            self.draw_tiles(painter, rect)
+
+            painter.setTransform(self.points_transform())
+            painter.setPen(self.pen_contour)
+            if i < 0:
+                painter.drawPolygon(self.points)
+            elif n > 2:
+                # ligne ouverte du sommet i+1 au sommet i-1
+                painter.drawPolyline(QPolygonF(self.points.mid(i + 1) + self.points.mid(0, i)))
+
+            if self.edit_mode:
+                painter.setPen(self.pen_vertex)
+                for k, p in enumerate(self.points):
+                    if k != i:
+                        painter.drawEllipse(QPointF(p), r, r)
+
+                painter.setPen(self.pen_middle)
+                prev_p = self.points[-1]
+                for k, p in enumerate(self.points):
+                    # milieux des deux segments du sommet déplacé
+                    if i < 0 or (k != i and k != (i + 1) % n):
+                        painter.drawEllipse(QPointF(p + prev_p) / 2, r, r)
+                    prev_p = p
+
+    def draw_vertex(self, painter, i):
+        """
+        Dessine le sommet i, ses deux segments et leurs repères (par-dessus les segments,
+        y compris ceux des sommets voisins).
+        """
+        n = self.points.size()
+        prev_p, p, next_p = self.points[(i - 1) % n], self.points[i], self.points[(i + 1) % n]
+        r = self.RADIUS / self.zoom * self.reference
+
+        painter.setTransform(self.points_transform())
+        painter.setPen(self.pen_contour)
+        painter.drawPolyline(QPolygonF([prev_p, p, next_p]))
+
+        if self.edit_mode:
+            painter.setPen(self.pen_vertex)
+            painter.drawEllipse(QPointF(prev_p), r, r)
+            painter.drawEllipse(QPointF(next_p), r, r)
+            painter.drawEllipse(QPointF(p), r, r)
+            painter.setPen(self.pen_middle)
+            painter.drawEllipse(QPointF(prev_p + p) / 2, r, r)
+            painter.drawEllipse(QPointF(p + next_p) / 2, r, r)
+
     def toggle_edit(self):
         self.edit_mode = not self.edit_mode
         self.info_event(f"Edit mode: {self.edit_mode}")
-        self.update()
+        self.invalidate()
 
         if self.edit_mode:
             self.measure_mode = False
@@ -44,41 +682,71 @@ class LineLabel(QLabel):
 
     def delete_point(self):
         if self.edit_mode and self.edit_point >= 0 and self.points.size() > 2:
-            self.points.remove(self.edit_point)
+            p = self.points[self.edit_point]
+            op = {"op": "delete", "i": self.edit_point, "point": [_coord(p.x()), _coord(p.y())]}
+            self.remove_at(self.edit_point)
             self.edit_point = -1
-            self.update()
+            self.invalidate()
+            self.record(op)
 
     def save_points(self, path: Path):
-        with path.open("w") as f:
-            json.dump(list((p.x(), p.y()) for p in self.points), f)
+        # coordonnées entières si elles le sont toutes (fichier .pts en entiers)
+        corsepoints.save(path, corsepoints.from_list(self.point_list()))
 
     def reset(self):
-        self.points = QPolygon(self.default_points)
+        op = {"op": "points", "from": self.point_list(), "to": list([_coord(p.x()), _coord(p.y())] for p in self.default_points)}
+        self.set_polygon(QPolygonF(self.default_points))
         self.edit_mode = False
         self.measure_mode = False
-        self.update()
+        self.invalidate()
+        if op["from"] != op["to"]:
+            self.record(op)
 
     def load_points(self, path: Path):
-        self.default_points = list([QPoint(*p) for p in json.loads(path.read_text())])
+        self.set_points(corsepoints.to_list(corsepoints.load(path)))
+
+    def set_points(self, points):
+        self.default_points = list([QPointF(*p) for p in points])
         self.reset()
 
     def mousePressEvent(self, event: QMouseEvent):
+        if event.button() != Qt.LeftButton:
+            # les autres boutons déplacent la vue
+            if not self.flag:
+                self.panning = event.position().toPoint()
+            return
+
         self.flag = True
-        self.x0 = event.position().toPoint().x()
-        self.y0 = event.position().toPoint().y()
+        dirty = self.measure_rect()
+        pos = self.to_image(event.position())
+        self.x0 = pos.x()
+        self.y0 = pos.y()
 
         if self.edit_mode and self.insert_point >= 0:
-            self.points.insert(self.insert_point, event.position().toPoint())
+            self.insert_at(self.insert_point, self.to_points(event.position()))
             self.edit_point = self.insert_point
             self.insert_point = -1
+            self.drag_start = (self.edit_point, None)
+        elif self.edit_mode and self.edit_point >= 0:
+            self.drag_start = (self.edit_point, QPointF(self.points[self.edit_point]))
+
+        if self.edit_mode and self.edit_point >= 0:
+            self.begin_drag(self.edit_point)
+        else:
+            self.update(dirty.united(self.measure_rect()))
 
     def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() != Qt.LeftButton:
+            self.panning = None
+            return
+
         self.flag = False
         if self.edit_mode:
-            pass
+            self.end_drag()
 
         else:
             self.measure_mode = True
+            self.update(self.measure_rect())
             self.info_event(
                 f"L: {round(math.sqrt((self.x1 - self.x0) ** 2 + (self.y1 - self.y0) ** 2),1)}"
                 + f" | H: {abs(self.x1 - self.x0)}"
@@ -87,70 +755,82 @@ class LineLabel(QLabel):
             )
 
     def mouseMoveEvent(self, event: QMouseEvent):
-        if self.flag:
+        pos = self.to_image(event.position())
+
+        if self.panning is not None:
+            d = event.position().toPoint() - self.panning
+            self.panning = event.position().toPoint()
+            self.pan(d.x(), d.y())
+
+        elif self.flag:
+            # seule la zone modifiée est redessinée, le reste vient du calque
             if self.edit_mode:
                 if self.edit_point >= 0:
-                    self.points[self.edit_point] = event.position().toPoint()
+                    dirty = self.vertex_rect(self.edit_point)
+                    self.move_point(self.edit_point, self.to_points(event.position()))
+                    self.update(dirty.united(self.vertex_rect(self.edit_point)))
+                    self.changed()
             else:
-                self.x1 = event.position().toPoint().x()
-                self.y1 = event.position().toPoint().y()
-            self.update()
+                dirty = self.measure_rect()
+                self.x1 = pos.x()
+                self.y1 = pos.y()
+                self.update(dirty.united(self.measure_rect()))
 
         elif self.edit_mode:
 
-            prev_p = self.points[-1]
             self.edit_point = -1
             self.insert_point = -1
 
-            for i, p in enumerate(self.points):
-                if (p - event.position().toPoint()).manhattanLength() < 5:
+            p = self.to_points(event.position())
+            hit = self.grid.nearest(p.x(), p.y(), self.RADIUS / self.zoom * self.reference)
+
+            if hit is None:
+                self.info_event("Edit mode")
+                self.unsetCursor()
+            else:
+                kind, h = hit
+                i = self.position[h]
+                if kind == "v":
                     self.edit_point = i
                     self.setCursor(Qt.SizeAllCursor)
                     self.info_event(f"Edit point: {i}")
-                    break
-
-                if ((p + prev_p) / 2 - event.position().toPoint()).manhattanLength() < 5:
+                else:
                     self.insert_point = i
                     self.setCursor(Qt.SplitHCursor)
                     self.info_event(f"Add point: {i}")
-                    break
-
-                prev_p = p
-
-            else:
-                self.info_event("Edit mode")
-                self.unsetCursor()
 
         if self.move_event:
-            self.move_event(event.position().toPoint())
+            self.move_event(pos)
 
     def paintEvent(self, event):
-        super().paintEvent(event)
-        with QPainter(self) as painter:
-            painter.setPen(QPen(Qt.red, 2, Qt.SolidLine))
-            painter.drawPolygon(self.points)
+        if self.layer is None or self.layer.size() != self.size():
+            self.draw_layer()
 
-            if self.edit_mode:
-                painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
+        with QPainter(self) as painter:
+            rect = event.rect()
+            painter.drawPixmap(rect, self.layer, rect)
 
-                prev_p = self.points[-1]
-                for p in self.points:
-                    painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
-                    painter.drawEllipse(p, 5, 5)
-                    painter.setPen(QPen(Qt.yellow, 2, Qt.SolidLine))
-                    painter.drawEllipse((p + prev_p) / 2, 5, 5)
-                    prev_p = p
+            if self.dragged >= 0:
+                self.draw_vertex(painter, self.dragged)
 
-            elif self.measure_mode:
-                painter.setPen(QPen(Qt.blue, 2, Qt.SolidLine))
+            if self.measure_mode and not self.edit_mode:
+                painter.setTransform(self.transform())
+                painter.setPen(self.pen_measure)
                 painter.drawLine(self.x0, self.y0, self.x1, self.y1)
 
 
 class Contour(QWidget):
-    def __init__(self, image_path: Path, points_path: Path = None):
+    def __init__(self, image_path: Path, points_path: Path = None, auto: bool = False, size: float = 27, thickness: float = 10):
         super().__init__()
         self.image_path = image_path
-        self.points_path = points_path or self.image_path.with_suffix(".json")
+        if points_path is None:
+            # points au format JSON, ou à défaut binaire
+            points_path = self.image_path.with_suffix(".json")
+            if not points_path.exists() and self.image_path.with_suffix(".pts").exists():
+                points_path = self.image_path.with_suffix(".pts")
+        self.points_path = points_path
+        self.auto = auto
+        self.stats = LiveStats(size, thickness / 10, self.show_stats)
         self.initUI()
 
     def keyPressEvent(self, event):
@@ -160,19 +840,26 @@ class Contour(QWidget):
     def initUI(self):
         self.setWindowTitle(f"Contour de {self.image_path.stem}")
 
-        pixmap = QPixmap(self.image_path.as_posix())
-        pixmap = pixmap.scaled(1200, 1200, Qt.KeepAspectRatio)
+        pyramid = Pyramid(self.image_path)
+        self.contour = LineLabel(self, [], pyramid)
+
+        journal = Journal(self.points_path)
+        recovered = journal.recover(self.points_path)
 
-        if self.points_path.exists():
-            points = list([QPoint(*p) for p in json.loads(self.points_path.read_text())])
+        if recovered is not None:
+            points = recovered
+            print(f"Contour restauré depuis la sauvegarde automatique {journal.snapshot}")
+        elif self.points_path.exists():
+            points = corsepoints.to_list(corsepoints.load(self.points_path))
+        elif self.auto:
+            points = corsepoints.to_list(corsetrace.trace(self.image_path))
         else:
-            r = pixmap.rect()
-            x_sixth = r.width() // 6
-            y_half = r.height() // 2
-            points = list((QPoint(x_sixth, y_half), QPoint(r.width() - x_sixth, y_half)))
+            width, height = self.contour.sizeHint().width(), self.contour.sizeHint().height()
+            points = [[width // 6, height // 2], [width - width // 6, height // 2]]
 
-        self.contour = LineLabel(self, points)
-        self.contour.setPixmap(pixmap)
+        self.contour.default_points = list([QPointF(*p) for p in points])
+        self.contour.set_polygon(QPolygonF(self.contour.default_points))
+        self.contour.journal = journal
         self.contour.setCursor(Qt.CrossCursor)
 
         lay = QVBoxLayout(self)
@@ -190,23 +877,59 @@ class Contour(QWidget):
 
         lay.addLayout(lay2)
 
+        self.stats_label = QLabel(self)
+        self.stats_label.setText("Statistiques")
+        # le texte ne doit pas redimensionner la fenêtre (et l'image) à chaque calcul
+        self.stats_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+        lay.addWidget(self.stats_label)
+
         self.contour.move_event = lambda pos: self.coords_label.setText("Coordonnées: ( %d , %d )" % (pos.x(), pos.y()))
         self.contour.info_event = lambda x: self.info_label.setText(x)
+        self.contour.edit_event = self.stats.request
+        self.stats.request(self.contour.points)
 
         QShortcut(QKeySequence(Qt.Key_E), self, activated=self.contour.toggle_edit)
         QShortcut(QKeySequence(Qt.Key_Backspace), self, activated=self.contour.delete_point)
         QShortcut(QKeySequence(Qt.Key_S), self, activated=self.save_points)
         QShortcut(QKeySequence(Qt.Key_R), self, activated=self.contour.reset)
         QShortcut(QKeySequence(Qt.Key_L), self, activated=self.load_points)
+        QShortcut(QKeySequence(Qt.Key_A), self, activated=self.trace_points)
+        QShortcut(QKeySequence(Qt.Key_F), self, activated=self.contour.fit)
+        QShortcut(QKeySequence.Undo, self, activated=self.contour.undo)
+        QShortcut(QKeySequence.Redo, self, activated=self.contour.redo)
 
+        self.resize(self.sizeHint())
         self.show()
 
+    def show_stats(self, stats):
+        if stats is None:
+            self.stats_label.setText("Statistiques: contour incomplet")
+            return
+        if isinstance(stats, Exception):
+            self.stats_label.setText(f"Statistiques: erreur {stats}")
+            return
+
+        sharpest = ", ".join(f"{i} ({angle}°)" for i, angle in stats.sharpest)
+        if stats.crossings:
+            segments = sorted(set(c.segment for c in stats.crossings))
+            interior = f"{len(stats.crossings)} croisement(s), segments {', '.join(map(str, segments[:5]))}" + (", ..." if len(segments) > 5 else "")
+        else:
+            interior = "OK"
+        self.stats_label.setText(
+            f"{stats.dim_x} × {stats.dim_y} cm"
+            + f" | {stats.segments} segments"
+            + f" | contour: {stats.length_contour} cm"
+            + f" | profilé: {stats.mean_length_real} cm"
+            + f" | angles aigus: {sharpest}"
+            + f" | bord intérieur: {interior}"
+        )
+
     def save_points(self):
         filename, _ = QFileDialog.getSaveFileName(
             self,
             f"Enregistrer le contour de {self.image_path.stem}",
             self.points_path.as_posix(),
-            "JSON (*.json)",
+            "Points (*.json *.pts)",
             options=QFileDialog.DontConfirmOverwrite | QFileDialog.DontUseNativeDialog,
         )
         if filename:
@@ -217,12 +940,21 @@ class Contour(QWidget):
             print(f"Points enregistrés dans {filename}")
             self.points_path = filename
 
+            # le contour est enregistré: nouvelle sauvegarde automatique pour ce fichier
+            self.contour.journal.discard()
+            self.contour.journal = Journal(filename)
+
+    def trace_points(self):
+        points = corsepoints.to_list(corsetrace.trace(self.image_path))
+        self.contour.set_points(points)
+        self.info_label.setText(f"Contour extrait: {len(points)} points")
+
     def load_points(self):
         filename, _ = QFileDialog.getOpenFileName(
             self,
             f"Chrger le contour de {self.image_path.stem}",
             "",
-            "JSON (*.json)",
+            "Points (*.json *.pts)",
             options=QFileDialog.DontUseNativeDialog,
         )
         if filename:
@@ -239,8 +971,11 @@ if __name__ == "__main__":
     )
     parse.add_argument("-i", "--image", type=Path, help="image", default="corse.png")
     parse.add_argument("-p", "--points", type=Path, help="fichier des points")
+    parse.add_argument("-a", "--auto", action="store_true", help="extrait le contour de l'image s'il n'y a pas de fichier des points")
+    parse.add_argument("--taille", dest="size", metavar="TAILLE", type=float, default=27, help="taille du modèle en cm pour les statistiques (défaut: 27)")
+    parse.add_argument("--epaisseur", dest="thickness", metavar="EPAISSEUR", type=float, default=10, help="épaisseur profilé en mm pour les statistiques (défaut: 10)")
     args = parse.parse_args()
 
     app = QApplication(sys.argv)
-    x = Contour(args.image, args.points)
+    x = Contour(args.image, args.points, args.auto, args.size, args.thickness)
     sys.exit(app.exec())
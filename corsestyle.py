@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Styles des tracés TikZ communs aux sorties PDF et SVG: couleurs, tirets et écriture des nombres.
+"""
+
+# couleurs TikZ en composantes RVB de 0 à 1
+COLORS = {
+    "black": (0, 0, 0),
+    "white": (1, 1, 1),
+    "cyan": (0, 1, 1),
+    "red": (1, 0, 0),
+    "green": (0, 1, 0),
+    "violet": (0.5, 0, 0.5),
+    "gray": (0.5, 0.5, 0.5),
+    "lightgray": (0.75, 0.75, 0.75),
+    "rowgray": (0.93, 0.93, 0.93),
+}
+
+# motifs de tirets TikZ, en points, en fonction de l'épaisseur du trait
+DASHES = {
+    "dotted": lambda w: [w, 2],
+    "densely dotted": lambda w: [w, 1],
+    "dashed": lambda w: [3, 3],
+    "dashdotted": lambda w: [3, 2, w, 2],
+}
+
+
+def number(v):
+    """
+    Nombre écrit avec au plus 4 décimales, sans zéros inutiles.
+    """
+    return f"{v:.4f}".rstrip("0").rstrip(".")
+
+
+def hex_color(color):
+    """
+    Couleur TikZ en notation #rrggbb.
+    """
+    return "#" + "".join(f"{round(c * 255):02x}" for c in COLORS[color])
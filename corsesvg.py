@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Écriture en flux de fichiers SVG du modèle, à l'échelle 1 (unités en cm).
+"""
+
+from xml.sax.saxutils import escape
+
+from corsestyle import DASHES, hex_color, number
+
+PT = 2.54 / 72  # cm par point
+
+
+class SvgWriter:
+    """
+    Écrit les éléments au fur et à mesure dans le fichier, sans les garder en mémoire.
+
+    La zone (x0, y0, x1, y1) est en cm dans le repère du modèle (y vers le haut, comme TikZ).
+    """
+
+    def __init__(self, file, x0, y0, x1, y1):
+        self.file = file
+        self.y1 = y1
+        width, height = x1 - x0, y1 - y0
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{number(width)}cm" height="{number(height)}cm" '
+            f'viewBox="{number(x0)} 0 {number(width)} {number(height)}">\n'
+        )
+        file.write('<g fill="none" stroke-linecap="round" stroke-linejoin="round" font-family="Helvetica, Arial, sans-serif">\n')
+
+    def _y(self, y):
+        return self.y1 - y
+
+    def _stroke(self, color, thickness, style):
+        w = float(str(thickness).removesuffix("pt"))
+        attrs = f'stroke="{hex_color(color)}" stroke-width="{number(w * PT)}"'
+        if style in DASHES:
+            attrs += f' stroke-dasharray="{" ".join(number(d * PT) for d in DASHES[style](w))}"'
+        return attrs
+
+    def line(self, points, color="black", thickness="0.5pt", style=None, cycle=False):
+        self.path([points], color, thickness, style, cycle)
+
+    def path(self, chunks, color="black", thickness="0.5pt", style=None, cycle=False):
+        """
+        Ligne brisée dont les points sont fournis par morceaux (listes ou tableaux (n, 2)).
+        """
+        write = self.file.write
+        write(f'<path {self._stroke(color, thickness, style)} d="M')
+        first = True
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if not first:
+                write(" L")
+            write(" L".join(f"{number(x)} {number(self.y1 - y)}" for x, y in chunk))
+            first = False
+        write(' Z"/>\n' if cycle else '"/>\n')
+
+    def rectangle(self, x0, y0, x1, y1, color="black", thickness="0.4pt", style=None, fill=None):
+        self.file.write(
+            f'<rect x="{number(x0)}" y="{number(self._y(y1))}" width="{number(x1 - x0)}" height="{number(y1 - y0)}" '
+            f'{self._stroke(color, thickness, style)}' + (f' fill="{hex_color(fill)}"' if fill else "") + "/>\n"
+        )
+
+    def text(self, x, y, text, size=10, color="black"):
+        self.file.write(
+            f'<text x="{number(x)}" y="{number(self._y(y))}" font-size="{number(size * PT)}" fill="{hex_color(color)}" '
+            f'text-anchor="middle" dominant-baseline="central">{escape(text)}</text>\n'
+        )
+
+    def item(self, item):
+        """
+        Élément de l'image (voir corsetex.tikz_item).
+        """
+        kind = item["kind"]
+        if kind == "line":
+            self.line(item["points"], item["color"], item.get("thickness", "0.5pt"), item.get("style"), item.get("cycle", False))
+        elif kind == "number":
+            # \tiny dans un rectangle blanc
+            x, y = item["at"]
+            w = (len(item["text"]) * 2.78 + 3.33) * PT
+            h = 6.9 * PT
+            self.rectangle(x - w / 2, y - h / 2, x + w / 2, y + h / 2, fill="white")
+            self.text(x, y, item["text"], size=5)
+        elif kind == "angle":
+            x, y = item["at"]
+            self.text(x, y, f"{item['text']}°", size=5, color="violet")
+
+    def close(self):
+        self.file.write("</g>\n</svg>\n")
+
+
+def frame(svg, tile, number):
+    """
+    Cadre d'une page: zone imprimée, bordure et numéro de page.
+    """
+    x0, y0, x1, y1, _ = tile
+    svg.rectangle(x0 - 0.5, y0 - 0.5, x1 + 0.5, y1 + 0.5, thickness="1pt", style="dashdotted")
+    svg.text((x0 + x1) / 2, (y0 + y1) / 2, f"Page {number}", size=24.88, color="lightgray")
+    svg.rectangle(x0, y0, x1, y1, color="gray", thickness="0.1pt", style="dashed")
@@ -2,23 +2,31 @@
 # rene-d 2022
 
 import argparse
-import json
+import csv
+import hashlib
+import os
+import shutil
 import subprocess
 import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 
+import corsebars
+import corsegeo
+import corsepages
+import corsepdf
+import corsepoints
+import corseprofile
+import corsesvg
+from corsecache import Cache, default_directory, source_version
+from corsecli import parse_values
+from corsegeo import Crossing, GridIndex, as_array, geometry, intersections, simplify
 
-def rotate(xy, radians):
-    c, s = np.cos(radians), np.sin(radians)
-    j = np.matrix([[c, s], [-s, c]])
-    m = np.dot(j, xy)
-    r_xy = float(m.T[0]), float(m.T[1])
-    return np.array(r_xy)
 
-
-def tikz_draw_line(tikz, points, color, thickness="0.5pt", style=None, cycle=False):
+def tikz_line(points, color, thickness="0.5pt", style=None, cycle=False):
     xy = "\n -- ".join(f"({p[0]},{p[1]})" for p in points)
     if cycle:
         xy += "\n -- cycle"
@@ -26,281 +34,644 @@ def tikz_draw_line(tikz, points, color, thickness="0.5pt", style=None, cycle=Fal
         style += ","
     else:
         style = ""
-    tikz.append(rf"\draw[{style}line width={thickness},color={color}] {xy};")
+    return rf"\draw[{style}line width={thickness},color={color}] {xy};"
+
+
+# cadre d'une page: zone de découpe, bordure et numéro de page
+TIKZ_FRAME = r"""
+\newcommand{\cadre}[4]{
+\clip({(#1-0.5)},{(#2-0.5)}) rectangle ({(#3+0.5)},{(#4+0.5)});
+\draw[dashdotted,line width=1pt,color=black] ({(#1-0.5)},{(#2-0.5)}) rectangle ({(#3+0.5)},{(#4+0.5)});
+\node[rectangle,text=lightgray] (r) at ({((#1+#3)/2)},{((#2+#4)/2)}) {\Huge Page \thepage};
+\draw[dashed,line width=0.1pt,color=gray] (#1,#2) rectangle (#3,#4);}
+"""
 
 
-def orientation(polygon):
+def _boxes(*points):
     """
-    Détermination orientation du polygone.
-    [principe](https://fr.wikipedia.org/wiki/Orientation_de_courbe)
+    Boîtes englobantes (x0, y0, x1, y1) de groupes de points, un groupe par segment.
     """
+    xy = np.stack(points)
+    return np.column_stack((xy.min(axis=0), xy.max(axis=0)))
 
-    # sélection du point
-    x_max = 0
-    y_max = 0
-    i_max = None
-    for i, p in enumerate(polygon):
-        x, y = p
-        if x >= x_max:
-            x_max = x
-            y_max = y
-            i_max = i
-        elif x == x_max and y > y_max:
-            y_max = y
-            i_max = i
 
-    # matrice d'orientation
-    p1 = polygon[(i_max - 1) % len(polygon)]
-    p2 = polygon[i_max]
-    p3 = polygon[(i_max + 1) % len(polygon)]
+def segment_items(points, geo, start=0, stop=None):
+    """
+    Éléments des segments [start, stop) du contour `points` (tableau (N, 2)), avec leur boîte englobante:
+    numéro, traits de construction, trait de coupe et angle.
+    """
+    n = len(points)
+    stop = n if stop is None else min(stop, n)
+    index = np.arange(start, stop)
+
+    p1 = points[index]
+    p2 = points[(index + 1) % n]
+
+    # traits de construction (pour vérifier les calculs!)
+    r1 = geo.normals[index] + p1
+    r2 = geo.normals[index] + p2
+
+    # trait de coupe [a,b]
+    interior = geo.interior[index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ab = interior - p2
+        ab = ab / np.hypot(ab[:, 0], ab[:, 1])[:, np.newaxis]
+    cut_a = p2 - ab * 0.3
+    cut_b = interior + ab * 0.5
+    p_angles = p2 - ab * 0.4
+    middles = (p1 + p2) / 2
+
+    boxes_middle = _boxes(middles).tolist()
+    boxes_construction = _boxes(p1, r1, r2, p2).tolist()
+    boxes_cut = _boxes(cut_a, cut_b).tolist()
+    boxes_angle = _boxes(p_angles).tolist()
+
+    p1, p2, r1, r2 = p1.tolist(), p2.tolist(), r1.tolist(), r2.tolist()
+    cut_a, cut_b, p_angles, middles = cut_a.tolist(), cut_b.tolist(), p_angles.tolist(), middles.tolist()
+    lengths = geo.lengths[index].tolist()
+    angles = np.degrees(geo.angles[index]).tolist()
+
+    for k, i in enumerate(range(start, stop)):
+
+        # affiche le numéro du segment
+        if lengths[k] > 1:
+            yield (*boxes_middle[k], dict(kind="number", at=middles[k], text=f"{1+i}"))
+
+        yield (*boxes_construction[k], dict(kind="line", points=[p1[k], r1[k], r2[k], p2[k]], color="black", style="dotted"))
+
+        if angles[k] >= 0:
+            color = "red"  # coupe angle aigu
+        else:
+            color = "green"  # coupe angle obtus
 
-    o = np.array([[1, p1[0], p1[1]], [1, p2[0], p2[1]], [1, p3[0], p3[1]]])
+        yield (*boxes_cut[k], dict(kind="line", points=[cut_a[k], cut_b[k]], color=color, thickness="0.25pt"))
 
-    return 1 if np.linalg.det(o) >= 0 else -1
+        # angle du contour
+        yield (*boxes_angle[k], dict(kind="angle", at=p_angles[k], text=f"{angles[k]:.0f}"))
 
 
-def tikz_image(corse, thickness, details=True):
+def segment_infos(corse, geo):
+    """
+    Informations de découpe de chaque segment (voir `tikz_image`).
+    """
+    return [
+        (
+            i + 1,
+            round(p1[0] * 10, 1),
+            round(p1[1] * 10, 1),  # coordonnées début du segment
+            round(length * 10, 1),  # longueur du segment
+            round(angle_degrees, 1),  # angle avec le segment suivant
+            round(cut_angle_degrees, 1),  # angle de coupe
+        )
+        for i, (p1, length, angle_degrees, cut_angle_degrees) in enumerate(
+            zip(corse, geo.lengths.tolist(), np.degrees(geo.angles).tolist(), geo.cut_angles.tolist())
+        )
+    ]
+
+
+def tikz_image(corse, thickness, details=True, geo=None):
+    """
+    Calcule l'image du contour. `geo` est la géométrie du contour si elle est déjà calculée
+    (`corsegeo.geometry` avec le bord intérieur).
+
+    L'image est décomposée pour être découpée en pages:
+    - `paths`: les lignes fermées (contour, bord intérieur), tracées segment par segment
+    - `items`: les éléments de chaque segment (numéro, traits de construction et de coupe, angle)
+      avec leur boîte englobante
+
+    Les éléments sont des dictionnaires indépendants du format de sortie (voir `tikz_item`).
+    """
 
     assert min(x for x, _ in corse) == 0
     assert min(y for _, y in corse) == 0
 
-    sens = orientation(corse)
+    if geo is None:
+        geo = geometry(corse, thickness, interior=details)
 
-    picture = []
-    infos = []
-
-    picture.append(
-        r"""
-\newcommand{\corse}[4]{
-\begin{tikzpicture}[line cap=round,line join=round,x=10mm,y=10mm]
-\clip({(#1-0.5)},{(#2-0.5)}) rectangle ({(#3+0.5)},{(#4+0.5)});
-\draw[dashdotted,line width=1pt,color=black] ({(#1-0.5)},{(#2-0.5)}) rectangle ({(#3+0.5)},{(#4+0.5)});
-\node[rectangle,text=lightgray] (r) at ({((#1+#3)/2)},{((#2+#4)/2)}) {\Huge Page \thepage};
-\draw[dashed,line width=0.1pt,color=gray] (#1,#2) rectangle (#3,#4);"""
-    )
+    infos = segment_infos(corse, geo)
 
     # dessine le contour
-    picture.append("% contour")
-    tikz_draw_line(picture, corse, color="cyan", thickness="1pt", cycle=True)
+    paths = [dict(points=[list(p) for p in corse], color="cyan", thickness="1pt", style=None)]
+    items = []
+
+    if details:
+        items = list(segment_items(as_array(corse), geo))
 
-    angles = []
-    total_length = 0
+        # dessine le contour intérieur
+        paths.append(dict(points=geo.interior.tolist(), color="black", thickness="0.5pt", style="densely dotted"))
 
-    for i, p in enumerate(corse):
-        # sommet du contour
-        p1 = p
-        p2 = corse[(i + 1) % len(corse)]
-        p3 = corse[(i + 2) % len(corse)]
+    max_x = max(x for x, _ in corse)
+    max_y = max(y for _, y in corse)
 
-        v1_2 = np.array(p1) - np.array(p2)
-        v2_3 = np.array(p3) - np.array(p2)
+    dimensions = [
+        round(max_x, 2),
+        round(max_y, 2),
+        round(geo.length_contour, 1),
+        round((geo.mid_length if details else geo.length_contour) + len(infos) * 0.2, 1),
+        len(corse),
+    ]
 
-        angle = np.math.atan2(np.linalg.det([v1_2, v2_3]), np.dot(v1_2, v2_3))
-        angles.append(angle)
+    return dict(paths=paths, items=items), infos, dimensions
 
-        # informations de découpe
-        angle_degrees = np.degrees(angle)
-        length = np.linalg.norm(v1_2)
 
-        total_length += length
+def tikz_item(item):
+    """
+    Commande TikZ d'un élément de l'image.
+    """
+    if item["kind"] == "line":
+        return tikz_line(item["points"], item["color"], item.get("thickness", "0.5pt"), item.get("style"), item.get("cycle", False))
+    x, y = item["at"]
+    if item["kind"] == "number":
+        return rf"\draw[color=black] ({x},{y}) node[rectangle,draw,fill=white] {{\tiny ${item['text']}$}};"
+    if item["kind"] == "angle":
+        return rf"\draw[color=violet] ({x},{y}) node[] {{\tiny ${item['text']}$\textdegree}};"
+    raise ValueError(item["kind"])
 
-        # calcul angle de coupe
-        if angle_degrees >= 0:
-            cut_angle_degrees = angle_degrees / 2  # angle saillant
-        else:
-            cut_angle_degrees = 180 + angle_degrees / 2  # angle rentrant
-
-        infos.append(
-            (
-                i + 1,
-                round(p1[0] * 10, 1),
-                round(p1[1] * 10, 1),  # coordonnées début du segment
-                round(length * 10, 1),  # longueur du segment
-                round(angle_degrees, 1),  # angle avec le segment suivant
-                round(cut_angle_degrees, 1),  # angle de coupe
-            )
-        )
 
-    interior = []  # bord intérieur
+def _runs(path, segments):
+    """
+    Segments `segments` (indices triés) d'une ligne fermée, regroupés par suites de segments consécutifs.
+    """
+    points = path["points"]
+    n = len(points)
+    style = dict(kind="line", color=path["color"], thickness=path["thickness"], style=path["style"])
 
-    if details:
+    if len(segments) == n:
+        return [dict(points=points, cycle=True, **style)]
 
-        for i, p in enumerate(corse):
+    breaks = np.flatnonzero(np.diff(segments) != 1)
+    runs = list(zip(np.r_[segments[0], segments[breaks + 1]].tolist(), np.r_[segments[breaks], segments[-1]].tolist()))
 
-            picture.append(f"% segment {i + 1}")
+    # la ligne est fermée: la dernière suite continue sur la première
+    if len(runs) > 1 and runs[0][0] == 0 and runs[-1][1] == n - 1:
+        runs[0] = (runs[-1][0] - n, runs[0][1])
+        runs.pop()
 
-            # points origine et extrémité
-            p1 = p
-            p2 = corse[(i + 1) % len(corse)]
+    return [dict(points=[points[m % n] for m in range(i, j + 2)], **style) for i, j in runs]
 
-            # angles origine/extrémité
-            a1 = angles[(i - 1) % len(corse)]
-            a2 = angles[i]
 
-            v = (np.array(p2) - np.array(p1)) * sens
-            u = v / np.linalg.norm(v) * thickness
+def cull(picture, tiles, margin=1):
+    """
+    Éléments de l'image qui touchent chaque page, dans l'ordre de tracé.
 
-            # affiche le numéro du segment
-            if np.linalg.norm(v) > 1:
-                xy_middle = (p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2
-                picture.append(rf"\draw[color=black] ({xy_middle[0]},{xy_middle[1]}) node[rectangle,draw,fill=white] {{\tiny ${1+i}$}};")
+    `tiles` est la liste des pages (x0, y0, x1, y1, landscape). Les éléments sont retrouvés
+    avec un index spatial de leurs boîtes englobantes, élargies de `margin` cm pour les étiquettes.
+    """
 
-            # traits de construction (pour vérifier les calculs!)
-            r = rotate(u, -np.pi / 2)
-            tikz_draw_line(picture, [p1, (*(r + p1),), (*(r + p2),), p2], color="black", style="dotted")
+    # boîtes des segments des lignes fermées, puis des éléments
+    boxes = []
+    owners = []
+    for k, path in enumerate(picture["paths"]):
+        p = as_array(path["points"])
+        boxes.append(_boxes(p, np.roll(p, -1, axis=0)))
+        owners.append(np.full(len(p), k))
+    items = picture["items"]
+    boxes.append(np.array([item[:4] for item in items], dtype=np.float64).reshape(-1, 4))
+    owners.append(np.full(len(items), -1))
 
-            if a2 >= 0:
-                color = "red"  # coupe angle aigu
-            else:
-                color = "green"  # coupe angle obtus
+    first = np.cumsum([0] + [len(b) for b in boxes])
+    index = GridIndex(np.concatenate(boxes))
+    owners = np.concatenate(owners)
 
-            xy = rotate(u / np.sin(a2 / 2), -a2 / 2) + p2
-            xy = (*xy,)
-            interior.append(xy)
+    pages = []
+    for x0, y0, x1, y1, _ in tiles:
+        found = index.query(x0 - margin, y0 - margin, x1 + margin, y1 + margin)
 
-            # trace le trait de coupe [a,b]
-            a = p2
-            b = xy
-            ab = np.array(xy) - np.array(p2)
-            ab = ab / np.linalg.norm(ab)
+        # contour, éléments des segments puis bord intérieur
+        elements = []
+        for k, path in enumerate(picture["paths"]):
+            segments = found[owners[found] == k] - first[k]
+            if len(segments) > 0:
+                elements.extend(_runs(path, segments))
+            if k == 0:
+                elements.extend(items[i - first[-2]][4] for i in found[owners[found] == -1].tolist())
 
-            tikz_draw_line(picture, [a - ab * 0.3, b + ab * 0.5], color=color, thickness="0.25pt")
+        pages.append(elements)
 
-            # angle du contour
-            p_angle = a - ab * 0.4
-            angle = np.degrees(a2)
-            picture.append(rf"\draw[color=violet] ({p_angle[0]},{p_angle[1]}) node[] {{\tiny ${angle:.0f}$\textdegree}};")
+    return pages
 
-        # dessine le contour intérieur
-        picture.append("% contour intérieur")
-        tikz_draw_line(picture, interior, color="black", thickness="0.5pt", style="densely dotted", cycle=True)
-
-    picture.append(r"\end{tikzpicture}")
-    picture.append("}")
-    picture.append("")
-
-    # la longueur du profilé est la longueur moyenne:
-    # - chaque bord est un trapèze, la surface du trapèze est (l1+l2)*h/2
-    # - la longueur du profilé est la surface du contour divisée par l'épaisseur
-    # - la surface du contour est la somme des surfaces des trapèzes, soit (∑(l1+l2))*h/2
-    # - et donc la longueur du profilé est ∑(l1+l2)/2
-    length_contour = 0
-    for i in range(len(corse)):
-        p1 = corse[i]
-        p2 = corse[(i + 1) % len(corse)]
-        v1_2 = np.array(p1) - np.array(p2)
-        length_contour += np.linalg.norm(v1_2)
-
-    length_interior = 0
-    for i in range(len(interior)):
-        p1 = interior[i]
-        p2 = interior[(i + 1) % len(corse)]
-        v2_3 = np.array(p1) - np.array(p2)
-        length_interior += np.linalg.norm(v2_3)
-
-    if len(interior) > 0:
-        mid_length = (length_contour + length_interior) / 2
+
+def tikz_pages(picture, tiles, margin=1):
+    """
+    Génère une image TikZ par page, qui ne contient que les éléments qui touchent la page.
+    """
+    pages = []
+    for (x0, y0, x1, y1, landscape), elements in zip(tiles, cull(picture, tiles, margin)):
+        page = [r"\begin{tikzpicture}[line cap=round,line join=round,x=10mm,y=10mm]", rf"\cadre{{{x0}}}{{{y0}}}{{{x1}}}{{{y1}}}"]
+        page.extend(map(tikz_item, elements))
+        page.append(r"\end{tikzpicture}")
+
+        page = "\n".join(page)
+        if landscape:
+            pages.append(r"\newpage\begin{landscape}" + page + r"\end{landscape}")
+        else:
+            pages.append(r"\newpage" + page)
+
+    return pages
+
+
+def svg_image(svg_file, corse, thickness, details=True, chunk=10000, geo=None):
+    """
+    Écrit l'image complète du contour en SVG, au fur et à mesure. `geo` est la géométrie du contour
+    si elle est déjà calculée.
+
+    Les éléments sont calculés par tranches de `chunk` segments: la mémoire utilisée ne dépend
+    pas du nombre de segments (hors tableaux de la géométrie).
+    """
+    points = as_array(corse)
+    n = len(points)
+    if geo is None:
+        geo = geometry(points, thickness, interior=details)
+    max_x, max_y = points.max(axis=0).tolist()
+
+    with open(svg_file, "w") as f:
+        svg = corsesvg.SvgWriter(f, -1, -1, max_x + 1, max_y + 1)
+
+        # contour, éléments des segments puis bord intérieur, comme dans tikz_image
+        svg.path((points[i : i + chunk].tolist() for i in range(0, n, chunk)), "cyan", "1pt", cycle=True)
+        if details:
+            for start in range(0, n, chunk):
+                for *_, item in segment_items(points, geo, start, start + chunk):
+                    svg.item(item)
+            svg.path((geo.interior[i : i + chunk].tolist() for i in range(0, n, chunk)), "black", "0.5pt", "densely dotted", cycle=True)
+        svg.close()
+
+
+def svg_pages(output_file, picture, tiles, margin=1):
+    """
+    Écrit un fichier SVG par page, qui ne contient que les éléments qui touchent la page.
+    """
+    files = []
+    for i, (tile, elements) in enumerate(zip(tiles, cull(picture, tiles, margin))):
+        x0, y0, x1, y1, _ = tile
+        svg_file = output_file.with_name(f"{output_file.stem}-{1 + i}.svg")
+        with open(svg_file, "w") as f:
+            svg = corsesvg.SvgWriter(f, x0 - 0.5, y0 - 0.5, x1 + 0.5, y1 + 0.5)
+            corsesvg.frame(svg, tile, 1 + i)
+            for item in elements:
+                svg.item(item)
+            svg.close()
+        files.append(svg_file)
+    return files
+
+
+def scale_points(points, width, recto=False):
+    # recalcule les coordonnées des points dans l'image
+    xy = as_array(points)
+    min_x, min_y = xy.min(axis=0).tolist()
+    max_x, max_y = xy.max(axis=0).tolist()
+    scale_width = 1 / (max_x - min_x) * width
+    x = (xy[:, 0] - min_x) * scale_width
+
+    # Nota: le polygone est censé être à l'endroit dans le repère de l'écran (0,0) en haut à gauche
+    # et donc à l'envers dans un repère mathématique classique comme celui utilisé par TikZ
+    if recto:
+        y = (max_y - xy[:, 1]) * scale_width
     else:
-        mid_length = length_contour
+        y = (xy[:, 1] - min_y) * scale_width
 
-    max_x = max(x for x, _ in corse)
-    max_y = max(y for _, y in corse)
+    return list(zip(x.tolist(), y.tolist()))
 
-    dimensions = [
-        round(max_x, 2),
-        round(max_y, 2),
-        round(length_contour, 1),
-        round(mid_length + len(infos) * 0.2, 1),
-        len(corse),
-    ]
 
-    return "\n".join(picture), infos, dimensions
+Sweep = namedtuple(
+    "Sweep",
+    [
+        "sizes",  # tailles du modèle (cm)
+        "thicknesses",  # épaisseurs du profilé (cm)
+        "dim_x",  # dimensions du modèle (cm), pour chaque taille
+        "dim_y",
+        "length_contour",  # longueur du contour (cm), pour chaque taille
+        "mean_length_real",  # longueur profilé (cm), pour chaque taille (lignes) et épaisseur (colonnes)
+        "segments",  # nombre de segments
+        "cut_min",  # angles de coupe min/max (degrés), indépendants de la taille et de l'épaisseur
+        "cut_max",
+    ],
+)
 
 
-def tikz_corse(picture, x1, y1, col, row, landscape=True):
+def sweep(sizes, thicknesses, points, recto=False):
+    """
+    Calcule les dimensions et longueurs pour toutes les combinaisons de tailles et d'épaisseurs, sans LaTeX.
 
-    page = rf"\corse{{{x1*col}}}{{{y1*row}}}{{{x1*(col+1)}}}{{{y1*(row+1)}}}"
+    Le modèle est calculé une seule fois pour une taille et une épaisseur unité: les sommets intérieurs
+    valent taille × sommet + épaisseur × décalage, et les longueurs sont évaluées en une seule opération
+    sur toute la grille.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64).ravel()
+    thicknesses = np.asarray(thicknesses, dtype=np.float64).ravel()
+
+    unit = as_array(scale_points(points, 1, recto))
+    geo = geometry(unit, 1)
+    n = len(unit)
+
+    # bord intérieur: sommets et décalages pour une épaisseur unité
+    p2 = np.roll(unit, -1, axis=0)
+    w = geo.interior - p2
+    dp = p2 - np.roll(p2, -1, axis=0)
+    dw = w - np.roll(w, -1, axis=0)
+
+    length_interior = np.empty((len(sizes), len(thicknesses)))
+    chunk = max(1, 1_000_000 // max(1, n * len(thicknesses)))
+    t = thicknesses[np.newaxis, :, np.newaxis]
+    for k in range(0, len(sizes), chunk):
+        s = sizes[k : k + chunk, np.newaxis, np.newaxis]
+        ex = s * dp[:, 0] + t * dw[:, 0]
+        ey = s * dp[:, 1] + t * dw[:, 1]
+        length_interior[k : k + chunk] = np.hypot(ex, ey).sum(axis=-1)
+
+    length_contour = sizes * geo.length_contour
+    mid_length = (length_contour[:, np.newaxis] + length_interior) / 2
+
+    return Sweep(
+        sizes,
+        thicknesses,
+        sizes * unit[:, 0].max(),
+        sizes * unit[:, 1].max(),
+        length_contour,
+        mid_length + n * 0.2,
+        n,
+        float(geo.cut_angles.min()),
+        float(geo.cut_angles.max()),
+    )
 
-    if landscape:
-        return r"\newpage\begin{landscape}" + page + r"\end{landscape}"
+
+def print_sweep(result, output_file=None):
+    """
+    Affiche le tableau du balayage, ou l'écrit en CSV.
+    """
+    header = ["taille", "épaisseur", "dim_x", "dim_y", "contour", "profilé", "segments", "coupe_min", "coupe_max"]
+    rows = []
+    for i, size in enumerate(result.sizes.tolist()):
+        for j, thickness in enumerate(result.thicknesses.tolist()):
+            rows.append(
+                (
+                    round(size, 2),
+                    round(thickness * 10, 2),
+                    round(float(result.dim_x[i]), 2),
+                    round(float(result.dim_y[i]), 2),
+                    round(float(result.length_contour[i]), 1),
+                    round(float(result.mean_length_real[i, j]), 1),
+                    result.segments,
+                    round(result.cut_min, 1),
+                    round(result.cut_max, 1),
+                )
+            )
+
+    if output_file:
+        with output_file.open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
     else:
-        return r"\newpage" + page
+        print(" ".join(f"{h:>9}" for h in header))
+        for row in rows:
+            print(" ".join(f"{v:>9}" for v in row))
+
+
+Statistics = namedtuple(
+    "Statistics",
+    [
+        "segments",  # nombre de segments
+        "dim_x",  # dimensions du modèle (cm)
+        "dim_y",
+        "length_contour",  # longueur du contour (cm)
+        "mean_length_real",  # longueur profilé (cm)
+        "sharpest",  # angles les plus aigus: liste de (sommet, angle en degrés), sommets numérotés à partir de 0
+        "crossings",  # croisements du bord intérieur (voir corsegeo.intersections)
+    ],
+)
+
+
+def statistics(width, thickness, points, sharpest=3):
+    """
+    Dimensions, longueurs, angles les plus aigus et croisements du bord intérieur, sans l'image TikZ
+    (statistiques de l'éditeur).
+    """
+    model = as_array(scale_points(points, width))
+    geo = geometry(model, thickness)
+    n = len(model)
+
+    # l'angle i est au sommet i+1, extrémité du segment i
+    angles = np.abs(np.degrees(geo.angles))
+    order = np.argsort(angles, kind="stable")[:sharpest].tolist()
+
+    return Statistics(
+        n,
+        round(float(model[:, 0].max()), 2),
+        round(float(model[:, 1].max()), 2),
+        round(geo.length_contour, 1),
+        round(geo.mid_length + n * 0.2, 1),
+        [((i + 1) % n, round(float(angles[i]), 1)) for i in order],
+        intersections(model, geo.interior),
+    )
 
 
-def calcule(width, thickness, points, show_details=False, output_file=None, recto=False):
+def scale_model(points, width, recto=False, tolerance=0):
+    """
+    Modèle à l'échelle, simplifié si `tolerance` (cm) est non nulle (voir `plan`).
+    Retourne (modèle, simplification).
+    """
+    model = scale_points(points, width, recto)
+    if tolerance <= 0:
+        return model, None
 
-    page_x, page_y = 27, 18
+    # les sommets extrêmes sont conservés: mêmes dimensions et même origine
+    xy = as_array(model)
+    extremes = np.r_[xy.argmin(axis=0), xy.argmax(axis=0)]
+    keep, removed, deviation = simplify(model, tolerance, extremes)
+    return [model[i] for i in keep.tolist()], (removed, deviation)
 
-    # recalcule les coordonnées des points dans l'image
-    min_x = min(x for x, _ in points)
-    max_x = max(x for x, _ in points)
-    min_y = min(y for _, y in points)
-    max_y = max(y for _, y in points)
-    scale_width = 1 / (max_x - min_x) * width
-    model = []
-    for x, y in points:
-        x = (x - min_x) * scale_width
-
-        # Nota: le polygone est censé être à l'endroit dans le repère de l'écran (0,0) en haut à gauche
-        # et donc à l'envers dans un repère mathématique classique comme celui utilisé par TikZ
-        if recto:
-            y = (max_y - y) * scale_width
-        else:
-            y = (y - min_y) * scale_width
 
-        model.append((x, y))
+Plan = namedtuple("Plan", ["model", "picture", "infos", "dimensions", "crossings", "simplification"])
 
-    picture_command, infos, (dim_x, dim_y, mean_length, mean_length_real, segments) = tikz_image(model, thickness, show_details)
 
-    preambule = r"""\documentclass[a4paper]{article}
-\usepackage[utf8]{inputenc}
-\usepackage{textcomp}
-\usepackage{tikz}
-\usepackage[margin=0mm]{geometry}
-\usepackage{pdflscape}
-\usepackage{pgfplotstable}
-\usepackage{graphicx}
-\usepackage{colortbl}
-\usepackage{multicol}
+def plan(width, thickness, points, show_details=False, recto=False, cache=None, tolerance=0):
+    """
+    Calcule le modèle à l'échelle, l'image TikZ, les informations de découpe et les croisements
+    du bord intérieur. Le résultat est lu dans le cache s'il a déjà été calculé.
 
-\pgfplotsset{compat=1.18}
-\pagestyle{empty}
-\geometry{left=10mm,top=10mm,right=0mm,bottom=0mm,paperwidth=210mm,paperheight=297mm}
-"""
+    Si `tolerance` (cm) est non nulle, le modèle est d'abord simplifié: les sommets quasiment
+    alignés sont supprimés. `simplification` est alors (sommets supprimés, écart maximal en cm).
+    """
+    if cache is not None:
+        with corseprofile.phase("cache"):
+            key = cache.key(as_array(points), width, thickness, show_details, recto, tolerance, source_version(__file__, corsegeo.__file__))
+            value = cache.get(key)
+        if value is not None:
+            corseprofile.count("cache_hits")
+            model, picture, infos, dimensions, crossings, simplification = value
+            return Plan(
+                list(map(tuple, model)),
+                picture,
+                list(map(tuple, infos)),
+                dimensions,
+                [Crossing(*c) for c in crossings],
+                simplification,
+            )
 
-    document = []
-    document.append(r"\begin{document}")
+    with corseprofile.phase("scale"):
+        model, simplification = scale_model(points, width, recto, tolerance)
 
-    print("dims", dim_x, dim_y)
-    print("page", page_x, page_y)
+    # le bord intérieur est calculé une fois, pour l'image et pour les croisements
+    with corseprofile.phase("tikz_image"):
+        geo = geometry(model, thickness)
+        picture, infos, dimensions = tikz_image(model, thickness, show_details, geo)
 
-    if dim_y % page_x >= page_y:
-        nb_x = np.math.ceil(dim_x / page_y)
-        nb_y = np.math.ceil(dim_y / page_x)
-        landscape = False
+    # contrôle que le bord intérieur ne se croise pas et ne croise pas le contour
+    with corseprofile.phase("intersections"):
+        crossings = intersections(model, geo.interior)
 
-        for y in range(nb_y):
-            for x in range(nb_x):
-                cmd = tikz_corse(picture_command, page_y, page_x, x, y, landscape)
-                print("page", 1 + x + y * nb_x, cmd)
-                document.append(cmd)
+    result = Plan(model, picture, infos, dimensions, crossings, simplification)
+    if cache is not None:
+        with corseprofile.phase("cache"):
+            cache.put(key, result)
+    return result
 
+
+# sémaphore qui limite le nombre de compilations LaTeX simultanées (voir corsebatch), None: pas de limite
+latex_slots = None
+
+
+def compile_latex(tex_file, fmt=None):
+    """
+    Compile le fichier .tex, le PDF est créé dans le même répertoire.
+    """
+    command = [
+        "texfot",
+        "latex",
+        *([f"-fmt={fmt}"] if fmt else []),
+        "-output-format=pdf",
+        "-interaction=nonstopmode",
+        f"-output-directory={tex_file.parent}",
+        tex_file,
+    ]
+    if latex_slots is None:
+        subprocess.check_call(command)
     else:
-        nb_x = np.math.ceil(dim_x / page_x)
-        nb_y = np.math.ceil(dim_y / page_y)
-        landscape = True
+        with latex_slots:
+            subprocess.check_call(command)
+
 
-        for y in range(nb_y):
-            for x in range(nb_x):
-                cmd = tikz_corse(picture_command, page_x, page_y, x, y, landscape)
-                print("page", 1 + x + y * nb_x, cmd)
-                document.append(cmd)
+def latex_format(preambule):
+    """
+    Format LaTeX précompilé du préambule (packages chargés une fois pour toutes), construit
+    avec mylatexformat si nécessaire et conservé dans le cache, indexé par l'empreinte du préambule.
+
+    Retourne le chemin du format sans l'extension .fmt, ou None s'il ne peut pas être construit.
+    """
+    name = "corse-" + hashlib.sha256(preambule.encode()).hexdigest()[:16]
+    directory = default_directory() / "fmt"
+    fmt = directory / f"{name}.fmt"
+
+    if not fmt.exists():
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / f"{name}.tex").write_text(preambule + "\\begin{document}\n\\end{document}\n")
+            subprocess.run(
+                ["latex", "-ini", f"-jobname={name}", "-output-format=pdf", "-interaction=nonstopmode", "&latex", "mylatexformat.ltx", f"{name}.tex"],
+                cwd=directory,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            print("format précompilé indisponible, compilation avec le préambule complet")
+            fmt.unlink(missing_ok=True)
+            return None
 
+    return fmt.with_suffix("")
+
+
+def up_to_date(tex_file, text):
+    """
+    Vrai si le PDF existe et a été compilé à partir du même source (empreinte dans le fichier .sha256).
+    """
+    digest_file = tex_file.with_suffix(".sha256")
+    if not tex_file.with_suffix(".pdf").exists() or not digest_file.exists():
+        return False
+    return digest_file.read_text().strip() == hashlib.sha256(text.encode()).hexdigest()
+
+
+def build(tex_file, text, fmt=None):
+    """
+    Écrit le source, le compile et enregistre son empreinte.
+    """
+    digest_file = tex_file.with_suffix(".sha256")
+    digest_file.unlink(missing_ok=True)
+    tex_file.write_text(text)
+
+    try:
+        compile_latex(tex_file, fmt)
+    except subprocess.CalledProcessError:
+        if fmt is None:
+            raise
+        # format périmé (autre version de TeX, package mis à jour...) ?
+        print("échec avec le format précompilé, compilation avec le préambule complet")
+        compile_latex(tex_file)
+        Path(f"{fmt}.fmt").unlink(missing_ok=True)
+
+    digest_file.write_text(hashlib.sha256(text.encode()).hexdigest() + "\n")
+
+
+def merge_command():
+    """
+    Commande d'assemblage de PDF disponible, None sinon.
+    """
+    if shutil.which("pdfunite"):
+        return lambda files, output: ["pdfunite", *files, output]
+    if shutil.which("qpdf"):
+        return lambda files, output: ["qpdf", "--empty", "--pages", *files, "--", output]
+    return None
+
+
+def build_parallel(output_file, preambule, parts, jobs=0, force=False, use_format=True):
+    """
+    Compile chaque partie (première page, contenu) comme un document séparé, en parallèle,
+    puis assemble les PDF dans l'ordre des pages.
+
+    Les compilations sont des processus LaTeX indépendants: le pool ne fait que les lancer et attendre.
+    Les parties inchangées depuis la dernière compilation ne sont pas recompilées.
+    """
+    directory = output_file.with_suffix(".parts")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    todo = []
+    pdf_files = []
+    for k, (first_page, body) in enumerate(parts):
+        text = preambule + TIKZ_FRAME + "\n".join([r"\begin{document}", rf"\setcounter{{page}}{{{first_page}}}", body, r"\end{document}"])
+        tex_file = directory / f"part-{k + 1:03d}.tex"
+        if force or not up_to_date(tex_file, text):
+            todo.append((tex_file, text))
+        pdf_files.append(tex_file.with_suffix(".pdf"))
+        corseprofile.count("tex_bytes", len(text.encode()))
+    corseprofile.count("latex_runs", len(todo))
+
+    print(f"compilation de {len(todo)}/{len(parts)} parties")
+    fmt = latex_format(preambule) if use_format and todo else None
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        for future in [pool.submit(build, tex_file, text, fmt) for tex_file, text in todo]:
+            future.result()
+
+    subprocess.check_call(merge_command()(pdf_files, output_file.with_suffix(".pdf")))
+
+
+def summary_document(dimensions, infos, crossings, frame, cutting=None):
+    """
+    Pages des dimensions et des segments, puis du plan de débit `cutting` s'il est donné
+    (source LaTeX, une ligne par élément de la liste).
+    """
+    dim_x, dim_y, mean_length, mean_length_real, segments = dimensions
+    page_x, page_y = frame
+
+    document = []
     document.append(r"\newpage\subsection*{Dimensions}")
     document.append(f"Taille : {dim_x} cm $\\times$ {dim_y} cm\\newline")
     document.append(f"Ratio x/y : {round(dim_x/dim_y,4)}\\newline")
     document.append(f"Longueur contour : {mean_length} cm ({segments} segments)\\newline")
     document.append(f"Longueur profilé : {mean_length_real} cm (longueur moyenne + trait de coupe 2 mm)\\newline")
+    if crossings:
+        xy = ", ".join(f"{c.segment}/{c.other}" + (" (contour)" if c.contour else "") for c in crossings)
+        document.append(f"\\textcolor{{red}}{{Croisements du bord intérieur : {xy}}}\\newline")
 
     document.append(f"Cadre : {page_x} cm $\\times$ {page_y} cm")
 
@@ -347,19 +718,195 @@ def calcule(width, thickness, points, show_details=False, output_file=None, rect
 
     document.append(r"\end{multicols*}")
 
-    # document.append(r"\section*{} {\color{gray} Made with {\ensuremath\heartsuit} in Corsica}")
-    document.append(r"\end{document}")
+    if cutting is not None:
+        document.extend(cutting_document(cutting))
+
+    return document
+
+
+def cutting_document(plan):
+    """
+    Page du plan de débit des barres (voir `corsebars.cutting_plan`): résumé de chaque barre et tableau
+    des pièces, barre par barre.
+    """
+    document = []
+    document.append(r"\newpage\subsection*{Débit des barres}")
+    document.append(f"Barres de {plan.bar:g} mm, trait de coupe {plan.kerf:g} mm : {len(plan.bars)} barre(s) (minimum {plan.lower_bound}), chute {plan.waste} mm\\newline")
+    for b, pieces in enumerate(plan.bars):
+        used = corsebars.used(pieces, plan.kerf)
+        document.append(f"Barre {b + 1} : {len(pieces)} pièce(s), {used} mm, chute {round(plan.bar - used, 1)} mm\\newline")
+    document.append(r"\textit{Le débit est la longueur hors tout de la pièce, pointes des onglets comprises.}")
+    document.append("")
+    document.append(r"\begin{multicols*}{3}\noindent")
+
+    rows = [(b + 1, p.segment, p.length, p.stock) for b, pieces in enumerate(plan.bars) for p in pieces]
+    for col in range(0, len(rows), 40):
+        document.append(
+            r"""\pgfplotstabletypeset[
+	col sep=comma,
+	every head row/.style={before row=\hline,after row=\hline},
+	every last row/.style={after row=\hline},
+	every first column/.style={column type/.add={|}{|}},
+	every last column/.style={column type/.add={}{|}},
+    every even row/.style={before row={\rowcolor[gray]{0.93}}},
+	columns/N/.style = {column type/.add={}{|}},
+	columns/Longueur/.style = {column type/.add={}{|}},
+	columns/Debit/.style = {column name={Débit}}
+]{"""
+        )
+        document.append(r"Barre,N,Longueur,Debit")
+        document.extend(",".join(map(str, row)) for row in rows[col : col + 40])
+        document.append("}")
+        document.append("")
+
+    document.append(r"\end{multicols*}")
 
-    with output_file.with_suffix(".tex").open("wt") as f:
-        f.write(preambule)
-        f.write(picture_command)
-        f.write("\n".join(document))
+    return document
 
+
+def report_simplification(model, simplification):
+    if simplification is not None:
+        removed, deviation = simplification
+        print(f"simplification: {removed} sommet(s) supprimé(s) sur {removed + len(model)}, écart maximal {deviation * 10:.2f} mm")
+
+
+def cutting_plan(infos, thickness, sens, bar, kerf):
+    """
+    Plan de débit affiché (voir `corsebars.cutting_plan`), None si une pièce ne peut pas être débitée.
+    """
     try:
-        subprocess.check_call(["texfot", "latex", "-output-format=pdf", "-interaction=nonstopmode", output_file.with_suffix(".tex")])
-    except subprocess.CalledProcessError as e:
-        print(e)
-        exit(2)
+        with corseprofile.phase("cutting"):
+            cutting = corsebars.cutting_plan(infos, thickness * 10, sens, bar, kerf)
+    except ValueError as e:
+        print(f"attention: {e}")
+        return None
+    corsebars.print_plan(cutting)
+    corseprofile.count("bars", len(cutting.bars))
+    return cutting
+
+
+def calcule(width, thickness, points, show_details=False, output_file=None, recto=False, cache=None, force=False, jobs=None, use_format=True, native=False, svg=False, pages_svg=False, tolerance=0, layout="grille", bar=None, kerf=2):
+    """
+    Génère le document du modèle. Une erreur de compilation lève subprocess.CalledProcessError.
+
+    `layout` est le découpage en pages (voir `corsepages.layout`).
+    Si `bar` est donné, le plan de débit des segments dans des barres de `bar` mm (trait de coupe `kerf` mm)
+    est affiché et ajouté au document.
+    """
+
+    page_x, page_y = 27, 18
+    corseprofile.count("vertices", len(points))
+
+    if svg:
+        # SVG complet écrit au fur et à mesure: ni image en mémoire, ni croisements, ni découpage en pages, ni cache
+        with corseprofile.phase("scale"):
+            model, simplification = scale_model(points, width, recto, tolerance)
+        report_simplification(model, simplification)
+        corseprofile.count("segments", len(model))
+
+        with corseprofile.phase("geometry"):
+            geo = geometry(model, thickness, interior=show_details)
+        if bar is not None:
+            cutting_plan(segment_infos(model, geo), thickness, geo.sens, bar, kerf)
+
+        with corseprofile.phase("svg"):
+            svg_image(output_file.with_suffix(".svg"), model, thickness, show_details, geo=geo)
+        print(f"{output_file.with_suffix('.svg')} généré")
+        if not pages_svg:
+            return
+
+    model, picture, infos, dimensions, crossings, simplification = plan(width, thickness, points, show_details, recto, cache, tolerance)
+    dim_x, dim_y, mean_length, mean_length_real, segments = dimensions
+    corseprofile.count("segments", segments)
+    corseprofile.count("crossings", len(crossings))
+
+    if not svg:
+        report_simplification(model, simplification)
+
+    for c in crossings:
+        other = "contour" if c.contour else "bord intérieur"
+        print(f"attention: le bord intérieur du segment {c.segment} croise le {other} du segment {c.other}")
+
+    cutting = None
+    if bar is not None and not svg:
+        cutting = cutting_plan(infos, thickness, corsegeo.orientation(model), bar, kerf)
+
+    preambule = r"""\documentclass[a4paper]{article}
+\usepackage[utf8]{inputenc}
+\usepackage{textcomp}
+\usepackage{tikz}
+\usepackage[margin=0mm]{geometry}
+\usepackage{pdflscape}
+\usepackage{pgfplotstable}
+\usepackage{graphicx}
+\usepackage{colortbl}
+\usepackage{multicol}
+
+\pgfplotsset{compat=1.18}
+\pagestyle{empty}
+\geometry{left=10mm,top=10mm,right=0mm,bottom=0mm,paperwidth=210mm,paperheight=297mm}
+\csname endofdump\endcsname
+"""
+
+    print("dims", dim_x, dim_y)
+    print("page", page_x, page_y)
+
+    with corseprofile.phase("layout"):
+        tiles = corsepages.layout(picture, dim_x, dim_y, (page_x, page_y), layout)
+
+    for i, tile in enumerate(tiles):
+        print("page", 1 + i, tile)
+    if layout != "fixe":
+        regular = len(corsepages.regular_tiles(dim_x, dim_y, (page_x, page_y)))
+        print(f"découpage {layout}: {len(tiles)} page(s) au lieu de {regular}, {regular - len(tiles)} page(s) économisée(s)")
+        corseprofile.count("pages_saved", regular - len(tiles))
+    corseprofile.count("pages", len(tiles))
+
+    if pages_svg:
+        # une page SVG à l'échelle 1, sans LaTeX
+        with corseprofile.phase("svg"):
+            for svg_file in svg_pages(output_file, picture, tiles):
+                print(f"{svg_file} généré")
+        return
+
+    if native:
+        # PDF écrit directement, sans LaTeX
+        with corseprofile.phase("pdf"):
+            pages = [corsepdf.tile_page(tile, elements, 1 + i) for i, (tile, elements) in enumerate(zip(tiles, cull(picture, tiles)))]
+            pages.extend(corsepdf.summary_pages(dimensions, infos, crossings, (page_x, page_y), cutting))
+            corsepdf.write_pdf(output_file.with_suffix(".pdf"), pages)
+        corseprofile.count("pdf_bytes", output_file.with_suffix(".pdf").stat().st_size)
+        return
+
+    with corseprofile.phase("document"):
+        pages = tikz_pages(picture, tiles)
+        document = summary_document(dimensions, infos, crossings, (page_x, page_y), cutting)
+
+    # document.append(r"\section*{} {\color{gray} Made with {\ensuremath\heartsuit} in Corsica}")
+
+    if jobs is not None:
+        parts = [(1 + i, page) for i, page in enumerate(pages)]
+        parts.append((1 + len(pages), "\n".join(document)))
+        if merge_command() is None:
+            print("pdfunite ou qpdf introuvable: compilation en série")
+        else:
+            with corseprofile.phase("latex", python=False):
+                build_parallel(output_file, preambule, parts, jobs, force, use_format)
+            return
+
+    with corseprofile.phase("document"):
+        text = preambule + TIKZ_FRAME + "\n".join([r"\begin{document}", *pages, *document, r"\end{document}"])
+    corseprofile.count("tex_bytes", len(text.encode()))
+
+    # compilation incrémentale: l'empreinte du source est conservée à côté du PDF
+    tex_file = output_file.with_suffix(".tex")
+    if not force and up_to_date(tex_file, text):
+        print(f"{output_file.with_suffix('.pdf')} est à jour")
+        return
+
+    with corseprofile.phase("latex", python=False):
+        build(tex_file, text, latex_format(preambule) if use_format else None)
+    corseprofile.count("latex_runs")
 
 
 def main():
@@ -370,8 +917,23 @@ def main():
     )
     parse.add_argument("-c", "--contour", action="store_true", help="affiche le contour uniqument")
     parse.add_argument("-r", "--recto", action="store_true", help="affiche le recto (verso par défaut)")
-    parse.add_argument("-p", "--points", type=Path, help="fichier de points", default="corse.json")
+    parse.add_argument("-p", "--points", type=Path, help="fichier de points (JSON ou binaire .pts)", default="corse.json")
     parse.add_argument("-o", "--output", type=Path, help="fichier PDF généré")
+    parse.add_argument("-t", "--tolerance", type=float, default=0, help="simplifie le contour avec une tolérance en mm")
+    parse.add_argument("-n", "--native", action="store_true", help="génère le PDF directement, sans LaTeX")
+    parse.add_argument("-s", "--svg", action="store_true", help="génère le modèle complet en SVG au lieu du PDF")
+    parse.add_argument("--svg-pages", action="store_true", help="génère un fichier SVG par page au lieu du PDF")
+    parse.add_argument("--no-cache", action="store_true", help="n'utilise pas le cache des calculs")
+    parse.add_argument("-f", "--force", action="store_true", help="recompile même si le PDF est à jour")
+    parse.add_argument("--no-format", action="store_true", help="n'utilise pas de format LaTeX précompilé")
+    parse.add_argument("-j", "--jobs", type=int, nargs="?", const=0, help="compile les pages en parallèle (défaut: nombre de cœurs)")
+    parse.add_argument("--pages", choices=corsepages.LAYOUTS, default="grille", help="découpage en pages: fixe (historique), grille (défaut) ou mixte")
+    parse.add_argument("-b", "--barre", type=float, help="plan de débit dans des barres de BARRE mm")
+    parse.add_argument("--trait", type=float, default=2, help="trait de coupe en mm (défaut: 2)")
+    parse.add_argument("-T", "--tailles", type=parse_values, help="balayage des tailles en cm (a,b,c ou début:fin:pas)")
+    parse.add_argument("-E", "--epaisseurs", type=parse_values, help="balayage des épaisseurs en mm (a,b,c ou début:fin:pas)")
+    parse.add_argument("--profile", type=Path, help="rapport JSON de la durée et de la mémoire de chaque phase")
+    parse.add_argument("--cprofile", type=Path, help="profil cProfile des phases Python")
     parse.add_argument(
         "size",
         metavar="taille",
@@ -391,24 +953,44 @@ def main():
 
     args = parse.parse_args()
 
-    if args.points.exists():
-        points = json.loads(args.points.read_text())
-    else:
-        parse.error(f"{args.points} does not exist")
+    with corseprofile.session(args.profile, args.cprofile):
+        if args.points.exists():
+            with corseprofile.phase("load"):
+                points = corsepoints.load(args.points)
+        else:
+            parse.error(f"{args.points} does not exist")
+
+        if args.tailles is not None or args.epaisseurs is not None:
+            sizes = args.tailles if args.tailles is not None else [args.size]
+            thicknesses = args.epaisseurs if args.epaisseurs is not None else [args.thickness]
+            with corseprofile.phase("sweep"):
+                result = sweep(sizes, np.asarray(thicknesses) / 10, points, recto=args.recto)
+            print_sweep(result, args.output)
+            return
+
+        if not args.output:
+            args.output = args.points.with_suffix(".pdf")
+            show_pdf = not (args.svg or args.svg_pages)
+        else:
+            show_pdf = False
 
-    if not args.output:
-        args.output = args.points.with_suffix(".pdf")
-        show_pdf = True
-    else:
-        show_pdf = False
+        cache = None if args.no_cache else Cache()
 
-    calcule(args.size, args.thickness / 10, points, not args.contour, output_file=args.output, recto=args.recto)
+        try:
+            calcule(args.size, args.thickness / 10, points, not args.contour, output_file=args.output, recto=args.recto, cache=cache, force=args.force, jobs=args.jobs, use_format=not args.no_format, native=args.native, svg=args.svg, pages_svg=args.svg_pages, tolerance=args.tolerance / 10, layout=args.pages, bar=args.barre, kerf=args.trait)
+        except subprocess.CalledProcessError as e:
+            print(e)
+            exit(2)
 
-    try:
-        if show_pdf and not Path("/.dockerenv").exists() and sys.platform == "darwin":
-            subprocess.run(["open", args.output])
-    except subprocess.CalledProcessError:
-        pass
+        if cache is not None:
+            print(f"cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+
+        try:
+            if show_pdf and not Path("/.dockerenv").exists() and sys.platform == "darwin":
+                with corseprofile.phase("viewer", python=False):
+                    subprocess.run(["open", args.output])
+        except subprocess.CalledProcessError:
+            pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Pyramide de tuiles d'une image, en cache sur disque: l'éditeur ne charge que les tuiles visibles.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+from pathlib import Path
+
+from PIL import Image
+
+from corsecache import default_directory
+
+TILE = 256  # côté des tuiles en pixels
+VERSION = 1  # format de la pyramide
+
+
+class Pyramid:
+    """
+    Niveau 0: image en pleine résolution, chaque niveau suivant est réduit de moitié
+    jusqu'à tenir dans une tuile. La tuile (col, row) du niveau l couvre les pixels
+    [col, col + 1) × [row, row + 1) × TILE × 2^l de l'image.
+
+    La pyramide est construite à la première ouverture de l'image (ou après sa modification),
+    dans $CORSE_CACHE/tiles. Les ouvertures suivantes ne lisent que sa description.
+    """
+
+    def __init__(self, image_path, directory=None):
+        image_path = Path(image_path)
+        st = image_path.stat()
+        key = hashlib.sha256(repr((str(image_path.resolve()), st.st_size, st.st_mtime_ns, TILE, VERSION)).encode()).hexdigest()
+        self.directory = Path(directory or default_directory()) / "tiles" / key
+
+        try:
+            info = json.loads((self.directory / "pyramid.json").read_text())
+        except (OSError, ValueError):
+            info = self.build(image_path)
+
+        self.width, self.height = info["size"]
+        self.sizes = info["levels"]
+        self.levels = len(self.sizes)
+
+    def build(self, image_path):
+        """
+        Découpe l'image en tuiles PNG, niveau par niveau. Le répertoire est écrit à part puis renommé,
+        pour ne jamais laisser une pyramide incomplète.
+        """
+        print(f"construction des tuiles de {image_path}")
+        Image.MAX_IMAGE_PIXELS = None  # scans de grande taille
+        image = Image.open(image_path)
+        alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if alpha else "RGB")
+
+        tmp = self.directory.with_name(f"{self.directory.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+
+        sizes = []
+        level = 0
+        while True:
+            w, h = image.size
+            sizes.append([w, h])
+            (tmp / str(level)).mkdir(parents=True)
+            for row in range(math.ceil(h / TILE)):
+                for col in range(math.ceil(w / TILE)):
+                    box = (col * TILE, row * TILE, min(w, (col + 1) * TILE), min(h, (row + 1) * TILE))
+                    image.crop(box).save(tmp / str(level) / f"{col}_{row}.png", compress_level=1)
+            if w <= TILE and h <= TILE:
+                break
+            image = image.reduce(2)
+            level += 1
+
+        info = {"size": sizes[0], "levels": sizes}
+        (tmp / "pyramid.json").write_text(json.dumps(info))
+        try:
+            os.replace(tmp, self.directory)
+        except OSError:
+            # construite en même temps par un autre processus
+            shutil.rmtree(tmp, ignore_errors=True)
+        return info
+
+    def level(self, zoom):
+        """
+        Niveau adapté à un affichage de `zoom` pixels d'écran par pixel de l'image:
+        le plus réduit dont la résolution reste au moins celle de l'écran.
+        """
+        if zoom >= 1:
+            return 0
+        return min(self.levels - 1, int(math.floor(math.log2(1 / zoom))))
+
+    def tiles(self, level, x0, y0, x1, y1):
+        """
+        Tuiles du niveau qui recouvrent la zone (x0, y0, x1, y1) en pixels de l'image:
+        liste de (col, row, zone couverte en pixels de l'image).
+        """
+        w, h = self.sizes[level]
+        span = TILE << level
+        result = []
+        for row in range(max(0, int(y0 // span)), min(math.ceil(h / TILE), int(y1 // span) + 1)):
+            for col in range(max(0, int(x0 // span)), min(math.ceil(w / TILE), int(x1 // span) + 1)):
+                tw = min(TILE, w - col * TILE)
+                th = min(TILE, h - row * TILE)
+                result.append((col, row, (col * span, row * span, tw << level, th << level)))
+        return result
+
+    def path(self, level, col, row):
+        return self.directory / str(level) / f"{col}_{row}.png"
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# rene-d 2022
+
+"""
+Extraction automatique du contour d'une forme dans une image (carte, silhouette).
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from corsegeo import simplify
+
+# taille de l'image dans corseqt6 (QPixmap.scaled(1200, 1200, Qt.KeepAspectRatio))
+SIZE = 1200
+
+
+def background_colors(rgb, band=0.02, share=0.05):
+    """
+    Couleurs du fond: couleurs dominantes (au moins `share` des pixels) d'une bande
+    de largeur relative `band` sur le bord de l'image.
+    """
+    h, w, _ = rgb.shape
+    b = max(2, round(band * min(h, w)))
+    border = np.concatenate(
+        (
+            rgb[:b].reshape(-1, 3),
+            rgb[-b:].reshape(-1, 3),
+            rgb[b:-b, :b].reshape(-1, 3),
+            rgb[b:-b, -b:].reshape(-1, 3),
+        )
+    ).astype(np.int64)
+
+    # histogramme des couleurs quantifiées sur 4 bits par composante
+    q = border >> 4
+    bins = (q[:, 0] << 8) | (q[:, 1] << 4) | q[:, 2]
+    counts = np.bincount(bins, minlength=4096)
+    dominant = np.flatnonzero(counts >= share * len(border))
+    if len(dominant) == 0:
+        dominant = [int(np.argmax(counts))]
+
+    return np.array([border[bins == k].mean(axis=0) for k in dominant])
+
+
+def shape_mask(rgb, threshold=14):
+    """
+    Masque de la forme: pixels dont la couleur est à plus de `threshold` de toutes les couleurs du fond.
+    """
+    colors = background_colors(rgb)
+    pixels = rgb.astype(np.int32)
+    mask = np.ones(rgb.shape[:2], dtype=bool)
+    for color in colors.round().astype(np.int32):
+        d = pixels - color
+        mask &= np.einsum("ijk,ijk->ij", d, d) > threshold * threshold
+    return mask
+
+
+def reduce(mask, step):
+    """
+    Réduit le masque d'un facteur `step` en moyennant des blocs de step × step pixels:
+    les valeurs fractionnaires servent à l'interpolation du contour.
+    """
+    h, w = mask.shape
+    h, w = h - h % step, w - w % step
+    return mask[:h, :w].reshape(h // step, step, w // step, step).mean(axis=(1, 3))
+
+
+def _cases():
+    """
+    Segments orientés de chaque configuration des carrés élémentaires (marching squares),
+    l'intérieur de la forme à droite (repère de l'écran, y vers le bas).
+
+    Coins dans le sens horaire: 0 haut-gauche, 1 haut-droit, 2 bas-droit, 3 bas-gauche.
+    Le côté c va du coin c au coin c+1: 0 haut, 1 droit, 2 bas, 3 gauche.
+    Pour les configurations en selle, la deuxième table relie les coins intérieurs par le centre.
+    """
+    tables = ({}, {})
+    for case in range(16):
+        inside = [bool(case >> (3 - c) & 1) for c in range(4)]
+        for joined in (False, True):
+            corners = inside if not joined else [not v for v in inside]
+            segments = []
+            for c in range(4):
+                # suite de coins (intérieurs, ou extérieurs pour une selle reliée) qui se termine en c
+                if corners[c] and not corners[(c + 1) % 4]:
+                    a = c
+                    while corners[(a - 1) % 4] and (a - 1) % 4 != c:
+                        a = (a - 1) % 4
+                    segment = (c, (a - 1) % 4)
+                    segments.append(segment if not joined else segment[::-1])
+            tables[joined][case] = segments
+    return tables
+
+
+_CASES = _cases()
+
+
+def boundary(field, level=0.5):
+    """
+    Contour extérieur de la plus grande forme du champ `field` (valeurs entre 0 et 1),
+    par marching squares: tableau (N, 2) de coordonnées (colonne, ligne).
+
+    Les segments de tous les carrés sont calculés en une fois, chaînés par leurs extrémités
+    puis regroupés en lignes fermées par sauts de pointeurs.
+    """
+    f = np.pad(np.asarray(field, dtype=np.float64), 1)
+    h, w = f.shape
+    inside = f > level
+
+    tl, tr, br, bl = inside[:-1, :-1], inside[:-1, 1:], inside[1:, 1:], inside[1:, :-1]
+    case = (tl.astype(np.int64) << 3) | (tr << 2) | (br << 1) | bl
+    center = (f[:-1, :-1] + f[:-1, 1:] + f[1:, 1:] + f[1:, :-1]) / 4 > level
+
+    # points de passage sur les arêtes horizontales [i, h*w) et verticales [h*w, 2*h*w)
+    ii, jj = np.mgrid[0 : h - 1, 0 : w - 1]
+    horizontal = lambda i, j: i * w + j
+    vertical = lambda i, j: h * w + i * w + j
+
+    starts, ends = [], []
+    for joined in (False, True):
+        for k, segments in _CASES[joined].items():
+            if not segments:
+                continue
+            if k in (0b1010, 0b0101):
+                cells = (case == k) & (center == joined)
+            elif joined:
+                continue
+            else:
+                cells = case == k
+            i, j = ii[cells], jj[cells]
+            sides = (horizontal(i, j), vertical(i, j + 1), horizontal(i + 1, j), vertical(i, j))
+            for a, b in segments:
+                starts.append(sides[a])
+                ends.append(sides[b])
+
+    if not starts:
+        return np.empty((0, 2))
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    m = len(starts)
+
+    # coordonnées des points de passage, interpolées
+    ids = np.concatenate((starts, ends))
+    vert = ids >= h * w
+    e = np.where(vert, ids - h * w, ids)
+    i, j = e // w, e % w
+    a = f[i, j]
+    b = np.where(vert, f[np.minimum(i + 1, h - 1), j], f[i, np.minimum(j + 1, w - 1)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(a != b, (level - a) / (b - a), 0.5), 0, 1)
+    x = np.where(vert, j, j + t) - 1
+    y = np.where(vert, i + t, i) - 1
+    start_xy = np.column_stack((x[:m], y[:m]))
+    end_xy = np.column_stack((x[m:], y[m:]))
+
+    # segment suivant: celui qui commence là où le segment se termine
+    position = np.full(2 * h * w, -1, dtype=np.int64)
+    position[starts] = np.arange(m)
+    succ = position[ends]
+
+    # chaque ligne fermée est identifiée par le plus petit numéro de ses segments
+    label = np.arange(m)
+    jump = succ.copy()
+    for _ in range(int(np.ceil(np.log2(max(m, 2)))) + 1):
+        label = np.minimum(label, label[jump])
+        jump = jump[jump]
+
+    # plus grande aire (formule du lacet), signe du contour extérieur
+    cross = start_xy[:, 0] * end_xy[:, 1] - end_xy[:, 0] * start_xy[:, 1]
+    areas = np.bincount(label, cross, minlength=m)
+    k = int(np.argmax(areas))
+
+    loop = [k]
+    s = int(succ[k])
+    while s != k:
+        loop.append(s)
+        s = int(succ[s])
+
+    return start_xy[loop]
+
+
+def fit(polygon, vertices):
+    """
+    Simplifie le polygone jusqu'à `vertices` sommets au plus: recherche par dichotomie
+    de la plus petite tolérance de Ramer-Douglas-Peucker qui convient.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64)
+    if len(polygon) <= vertices:
+        return polygon
+
+    lo, hi = 0.0, float(np.ptp(polygon, axis=0).max())
+    keep = simplify(polygon, hi).keep
+    for _ in range(40):
+        tolerance = (lo + hi) / 2
+        k = simplify(polygon, tolerance).keep
+        if len(k) <= vertices:
+            hi, keep = tolerance, k
+        else:
+            lo = tolerance
+    return polygon[keep]
+
+
+def trace(image_path, vertices=60, threshold=14, step=2, size=SIZE):
+    """
+    Points du contour de la forme principale de l'image, dans le repère de l'image
+    réduite à `size` pixels (celui de corseqt6).
+    """
+    rgb = np.asarray(Image.open(image_path).convert("RGB"))
+    h, w, _ = rgb.shape
+    scale = min(size / w, size / h)
+
+    # réduction du masque à la résolution de travail: step pixels de l'image affichée
+    factor = max(1, round(step / scale))
+    field = reduce(shape_mask(rgb, threshold), factor)
+
+    polygon = fit(boundary(field), vertices) * factor * scale
+
+    points = []
+    for x, y in np.rint(polygon).astype(int).tolist():
+        if not points or points[-1] != [x, y]:
+            points.append([x, y])
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def main():
+
+    parse = argparse.ArgumentParser(
+        description="Extrait le contour de la forme principale d'images",
+        formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=30),
+    )
+    parse.add_argument("images", metavar="image", nargs="+", type=Path, help="image (PNG, JPEG...)")
+    parse.add_argument("-n", "--vertices", type=int, default=60, help="nombre maximal de sommets (défaut: 60)")
+    parse.add_argument("-t", "--threshold", type=float, default=14, help="écart de couleur minimal avec le fond (défaut: 14)")
+    parse.add_argument("-s", "--step", type=int, default=2, help="résolution de travail en pixels (défaut: 2)")
+    parse.add_argument("-d", "--directory", type=Path, help="répertoire des fichiers de points")
+    parse.add_argument("-f", "--force", action="store_true", help="remplace les fichiers de points existants")
+
+    args = parse.parse_args()
+
+    for image in args.images:
+        output = (args.directory or image.parent) / image.with_suffix(".json").name
+        if output.exists() and not args.force:
+            print(f"{output} existe déjà")
+            continue
+        points = trace(image, args.vertices, args.threshold, args.step)
+        output.write_text(json.dumps(points))
+        print(f"{output}: {len(points)} points")
+
+
+if __name__ == "__main__":
+    main()